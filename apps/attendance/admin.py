@@ -1,27 +1,38 @@
 import csv
-import datetime
 
 from django import forms
 from django.contrib import admin, messages
+from django.db import transaction
 from django.db.models import Count
 from django.http import HttpResponse
-from django.urls import reverse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import path, reverse
 from django.utils.html import format_html
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
 
-from .importers import import_students_to_course, parse_ubys_student_list
+from apps.core.jobs import queue_warning, submit
+
+from .importers import RosterDiff, parse_ubys_file, plan_roster_import
 from .models import (
     AttendanceRecord,
     ClassSession,
     Course,
     CourseMaterial,
+    CourseReportSnapshot,
     Enrollment,
     ExcusedAbsence,
     Holiday,
     Schedule,
+    SemesterArchive,
     Student,
 )
+from .scheduling import (
+    SCHEDULE_SLOT_FIELDS,
+    cancel_holiday_sessions,
+    resync_schedule_sessions,
+    restore_holiday_sessions,
+)
 
 
 # --- Resources for import/export ---
@@ -49,10 +60,35 @@ class AttendanceRecordResource(resources.ModelResource):
 # --- Inlines ---
 
 class EnrollmentInline(admin.TabularInline):
+    """Existing enrollments, student shown read-only.
+
+    An autocomplete widget on every row costs one query per enrollment, so
+    new enrollments are added through NewEnrollmentInline instead.
+    """
+
+    model = Enrollment
+    extra = 0
+    fields = ["student"]
+    readonly_fields = ["student"]
+
+    def get_queryset(self, request):
+        # Rows are titled with str(enrollment), which reads both relations
+        return super().get_queryset(request).select_related("student", "course")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class NewEnrollmentInline(admin.TabularInline):
     model = Enrollment
     extra = 0
     autocomplete_fields = ["student"]
     fields = ["student"]
+    verbose_name = "new enrollment"
+    verbose_name_plural = "add enrollments"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).none()
 
 
 class CourseMaterialInline(admin.TabularInline):
@@ -88,14 +124,38 @@ class AttendanceRecordInline(admin.TabularInline):
     readonly_fields = ["student_id_entered", "student", "ip_address", "user_agent", "timestamp"]
     can_delete = False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("student", "session__course")
+
     def has_add_permission(self, request, obj=None):
         return False
 
 
 class ExcusedAbsenceInline(admin.TabularInline):
+    """Existing excuses; see EnrollmentInline for why the student is read-only."""
+
+    model = ExcusedAbsence
+    extra = 0
+    fields = ["student", "reason"]
+    readonly_fields = ["student"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("student", "session__course")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class NewExcusedAbsenceInline(admin.TabularInline):
     model = ExcusedAbsence
     extra = 0
     autocomplete_fields = ["student"]
+    fields = ["student", "reason"]
+    verbose_name = "new excused absence"
+    verbose_name_plural = "add excused absences"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).none()
 
 
 # --- Admin classes ---
@@ -112,7 +172,7 @@ class CourseAdminForm(forms.ModelForm):
     student_list_file = forms.FileField(
         required=False,
         label="UBYS Student List (.xls)",
-        help_text="Upload the UBYS attendance .xls file to import students and create enrollments.",
+        help_text="Upload the UBYS attendance .xls file to preview and then import students and enrollments.",
     )
 
     class Meta:
@@ -120,6 +180,9 @@ class CourseAdminForm(forms.ModelForm):
         fields = "__all__"
 
 
+ROSTER_PREVIEW_SESSION_KEY = "roster_import_preview_{}"
+
+
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     form = CourseAdminForm
@@ -127,7 +190,7 @@ class CourseAdmin(admin.ModelAdmin):
     search_fields = ["code", "name"]
     list_filter = ["semester"]
     readonly_fields = ["qr_token", "slug"]
-    inlines = [ScheduleInline, EnrollmentInline, CourseMaterialInline]
+    inlines = [ScheduleInline, EnrollmentInline, NewEnrollmentInline, CourseMaterialInline]
     actions = ["export_attendance_matrix", "regenerate_sessions"]
 
     fieldsets = (
@@ -139,7 +202,8 @@ class CourseAdmin(admin.ModelAdmin):
         }),
         ("Student Import", {
             "fields": ("student_list_file",),
-            "description": "Upload a UBYS .xls file to bulk-import students into this course.",
+            "description": "Upload a UBYS .xls file to bulk-import students into this course. "
+                           "You will see a preview of the changes before anything is saved.",
         }),
         ("Auto Fields", {
             "fields": ("qr_token", "slug"),
@@ -147,6 +211,16 @@ class CourseAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_urls(self):
+        urls = [
+            path(
+                "<int:course_id>/roster-preview/",
+                self.admin_site.admin_view(self.roster_preview_view),
+                name="attendance_course_roster_preview",
+            ),
+        ]
+        return urls + super().get_urls()
+
     @admin.display(description="QR Code")
     def qr_code_link(self, obj):
         url = reverse("course_qr_code", args=[obj.pk])
@@ -173,186 +247,176 @@ class CourseAdmin(admin.ModelAdmin):
             messages.warning(request, "Please select exactly one course to export.")
             return
         course = queryset.first()
-
-        sessions = ClassSession.objects.filter(
-            course=course, is_cancelled=False
-        ).order_by("date", "start_time")
-        enrollments = Enrollment.objects.filter(course=course).select_related("student")
-
-        # Build set of (student_pk, session_pk) each student attended
-        attended = set(
-            AttendanceRecord.objects.filter(
-                session__course=course, session__is_cancelled=False, student__isnull=False
-            ).values_list("student_id", "session_id")
+        job = submit(
+            "attendance.export_matrix",
+            {"course_id": course.pk},
+            description=f"Export attendance for {course.code}",
+            user=request.user,
+            return_url=reverse("admin:attendance_course_changelist"),
         )
-
-        # Build set of (student_pk, session_pk) for excused absences
-        excused = set(
-            ExcusedAbsence.objects.filter(
-                session__course=course, session__is_cancelled=False
-            ).values_list("student_id", "session_id")
-        )
-
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = f'attachment; filename="{course.code}_attendance.csv"'
-        writer = csv.writer(response)
-
-        # Header: Student ID, Name, date columns..., Total, %
-        header = ["Student ID", "Name"]
-        for s in sessions:
-            header.append(f"W{s.week_number} {s.date.strftime('%m/%d')}")
-        header += ["Attended", "Total", "Excused", "%"]
-        writer.writerow(header)
-
-        total_sessions = sessions.count()
-        for enrollment in enrollments:
-            student = enrollment.student
-            row = [student.student_id, student.name]
-            student_attended = 0
-            student_excused = 0
-            for s in sessions:
-                if (student.pk, s.pk) in excused:
-                    row.append("E")
-                    student_excused += 1
-                elif (student.pk, s.pk) in attended:
-                    row.append("P")
-                    student_attended += 1
-                else:
-                    row.append("A")
-            effective_total = total_sessions - student_excused
-            pct = round(student_attended / effective_total * 100) if effective_total > 0 else 0
-            row += [student_attended, total_sessions, student_excused, f"{pct}%"]
-            writer.writerow(row)
-
-        return response
+        return redirect("job_status", job.pk)
 
     @admin.action(description="Regenerate sessions (deletes empty sessions, creates from current schedule)")
     def regenerate_sessions(self, request, queryset):
-        for course in queryset:
-            if not course.semester_start_date:
-                messages.warning(request, f"{course.code}: no semester start date set, skipping.")
-                continue
-
-            schedules = course.schedules.all()
-            if not schedules.exists():
-                messages.warning(request, f"{course.code}: no schedules defined, skipping.")
-                continue
-
-            # Delete sessions with zero attendance records
-            empty_sessions = ClassSession.objects.filter(course=course).annotate(
-                record_count=Count("records")
-            ).filter(record_count=0)
-            deleted_count = empty_sessions.count()
-            empty_sessions.delete()
-
-            # Regenerate from current schedules
-            holiday_dates = set(Holiday.objects.values_list("date", flat=True))
-            created_count = 0
-            skipped = 0
-            for schedule in schedules:
-                for week in range(course.total_weeks):
-                    week_start = course.semester_start_date + datetime.timedelta(weeks=week)
-                    days_ahead = schedule.day_of_week - week_start.weekday()
-                    if days_ahead < 0:
-                        days_ahead += 7
-                    session_date = week_start + datetime.timedelta(days=days_ahead)
-
-                    if session_date in holiday_dates:
-                        skipped += 1
-                        continue
-
-                    _, created = ClassSession.objects.get_or_create(
-                        course=course,
-                        date=session_date,
-                        start_time=schedule.start_time,
-                        defaults={
-                            "end_time": schedule.end_time,
-                            "week_number": week + 1,
-                        },
-                    )
-                    if created:
-                        created_count += 1
-
-            parts = [f"{course.code}: deleted {deleted_count} empty sessions, created {created_count} new sessions."]
-            if skipped:
-                parts.append(f"Skipped {skipped} holiday(s).")
-            messages.success(request, " ".join(parts))
+        course_ids = list(queryset.values_list("pk", flat=True))
+        job = submit(
+            "attendance.regenerate_sessions",
+            {"course_ids": course_ids},
+            description=f"Regenerate sessions for {len(course_ids)} course(s)",
+            user=request.user,
+            return_url=reverse("admin:attendance_course_changelist"),
+        )
+        return redirect("job_status", job.pk)
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
 
-        # --- Student import from uploaded file ---
+        # --- Student import from uploaded file (phase one: preview only) ---
         uploaded_file = form.cleaned_data.get("student_list_file")
         if uploaded_file:
             try:
-                students = parse_ubys_student_list(uploaded_file)
-                created_students, created_enrollments = import_students_to_course(obj, students)
-                messages.success(
-                    request,
-                    f"Imported {len(students)} students: "
-                    f"{created_students} new students, {created_enrollments} new enrollments.",
-                )
+                roster = parse_ubys_file(uploaded_file)
+                diff = plan_roster_import([(obj, roster.students)])
             except Exception as e:
                 messages.error(request, f"Student import failed: {e}")
-
-        # --- Auto-generate ClassSessions ---
-        if obj.semester_start_date:
-            schedules = obj.schedules.all()
-            if schedules.exists():
-                holiday_dates = set(Holiday.objects.values_list("date", flat=True))
-                session_count = 0
-                skipped = 0
-                for schedule in schedules:
-                    for week in range(obj.total_weeks):
-                        # Find the date for this schedule's day_of_week in the given week
-                        week_start = obj.semester_start_date + datetime.timedelta(weeks=week)
-                        # semester_start_date weekday vs schedule day_of_week
-                        days_ahead = schedule.day_of_week - week_start.weekday()
-                        if days_ahead < 0:
-                            days_ahead += 7
-                        session_date = week_start + datetime.timedelta(days=days_ahead)
-
-                        if session_date in holiday_dates:
-                            skipped += 1
-                            continue
-
-                        _, created = ClassSession.objects.get_or_create(
-                            course=obj,
-                            date=session_date,
-                            start_time=schedule.start_time,
-                            defaults={
-                                "end_time": schedule.end_time,
-                                "week_number": week + 1,
-                            },
-                        )
-                        if created:
-                            session_count += 1
-
-                parts = []
-                if session_count:
-                    parts.append(f"Generated {session_count} class sessions for {obj.total_weeks} weeks.")
-                if skipped:
-                    parts.append(f"Skipped {skipped} session(s) on holidays.")
-                if parts:
-                    messages.success(request, " ".join(parts))
+            else:
+                request.session[ROSTER_PREVIEW_SESSION_KEY.format(obj.pk)] = {
+                    "file": uploaded_file.name,
+                    "students": len(roster.students),
+                    "course_code": roster.course_code,
+                    "diff": diff.to_dict(),
+                }
+                request._roster_preview_pending = obj.pk
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not Schedule:
+            return super().save_formset(request, form, formset, change)
+
+        edited = [f.instance.pk for f in formset.forms if f.instance.pk and f.has_changed()]
+        previous = {s.pk: s for s in Schedule.objects.filter(pk__in=edited)} if edited else {}
+        super().save_formset(request, form, formset, change)
+
+        # Edited slots only move their own future sessions instead of a full replan
+        request._resynced_schedule_ids = set()
+        for schedule, changed_fields in formset.changed_objects:
+            if schedule.pk in previous and set(changed_fields) & set(SCHEDULE_SLOT_FIELDS):
+                result = resync_schedule_sessions(schedule, previous[schedule.pk])
+                request._resynced_schedule_ids.add(schedule.pk)
+                messages.info(request, f"{schedule}: {result}.")
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        obj = form.instance
+
+        # --- Auto-generate ClassSessions (after inlines, so new schedules count) ---
+        if obj.semester_start_date and obj.schedules.exists():
+            job = submit(
+                "attendance.sync_sessions",
+                {"course_id": obj.pk, "skip_schedule_ids": sorted(getattr(request, "_resynced_schedule_ids", ()))},
+                description=f"Generate sessions for {obj.code}",
+                user=request.user,
+                return_url=reverse("admin:attendance_course_change", args=[obj.pk]),
+            )
+            messages.info(
+                request,
+                format_html('Generating sessions in the background: <a href="{}">job #{}</a>.',
+                            reverse("job_status", args=[job.pk]), job.pk),
+            )
+            warning = queue_warning()
+            if warning:
+                messages.warning(request, warning)
+
+    def response_add(self, request, obj, post_url_continue=None):
+        if getattr(request, "_roster_preview_pending", None):
+            return redirect("admin:attendance_course_roster_preview", obj.pk)
+        return super().response_add(request, obj, post_url_continue)
+
+    def response_change(self, request, obj):
+        if getattr(request, "_roster_preview_pending", None):
+            return redirect("admin:attendance_course_roster_preview", obj.pk)
+        return super().response_change(request, obj)
+
+    def roster_preview_view(self, request, course_id):
+        """Phase two of a roster upload: review the staged diff, then apply or discard it."""
+        course = get_object_or_404(Course, pk=course_id)
+        if not self.has_change_permission(request, course):
+            return redirect("admin:attendance_course_change", course.pk)
+
+        session_key = ROSTER_PREVIEW_SESSION_KEY.format(course.pk)
+        preview = request.session.get(session_key)
+        if preview is None:
+            messages.warning(request, "No pending student import for this course. Upload the file again.")
+            return redirect("admin:attendance_course_change", course.pk)
+
+        diff = RosterDiff.from_dict(preview["diff"])
+
+        if request.method == "POST":
+            del request.session[session_key]
+            if request.POST.get("action") == "apply":
+                job = submit(
+                    "attendance.apply_roster",
+                    {
+                        "diff": preview["diff"],
+                        "students": preview["students"],
+                        "update_names": bool(request.POST.get("update_names")),
+                    },
+                    description=f"Import students into {course.code}",
+                    user=request.user,
+                    return_url=reverse("admin:attendance_course_change", args=[course.pk]),
+                )
+                return redirect("job_status", job.pk)
+            else:
+                messages.info(request, "Student import discarded; nothing was changed.")
+            return redirect("admin:attendance_course_change", course.pk)
+
+        return render(request, "admin/roster_preview.html", {
+            **self.admin_site.each_context(request),
+            "title": f"Review student import — {course.code}",
+            "course": course,
+            "preview": preview,
+            "new_students": diff.new_students,
+            "renamed_students": diff.renamed_students,
+            "new_enrollments": diff.new_enrollments.get(course.pk, []),
+            "missing_enrollments": diff.missing_enrollments.get(course.pk, []),
+            "code_mismatch": preview["course_code"] and preview["course_code"] != course.code,
+            "is_empty": diff.is_empty,
+        })
 
 
 @admin.register(Holiday)
 class HolidayAdmin(admin.ModelAdmin):
-    list_display = ["date", "name"]
+    list_display = ["date", "end_date", "name"]
     ordering = ["date"]
 
     def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        cancelled = ClassSession.objects.filter(date=obj.date, is_cancelled=False).update(is_cancelled=True)
+        with transaction.atomic():
+            previous = Holiday.objects.get(pk=obj.pk) if change else None
+            super().save_model(request, obj, form, change)
+            restored = 0
+            if previous is not None:
+                # The saved row already covers the new range, so only dates
+                # that dropped out of the holiday are restored.
+                restored = restore_holiday_sessions(previous.date, previous.last_date)
+            cancelled = cancel_holiday_sessions(obj.date, obj.last_date)
         if cancelled:
-            messages.info(request, f"Auto-cancelled {cancelled} session(s) on {obj.date} ({obj.name}).")
+            messages.info(request, f"Auto-cancelled {cancelled} session(s) for {obj}.")
+        if restored:
+            messages.info(request, f"Restored {restored} session(s) outside the new dates.")
 
     def delete_model(self, request, obj):
-        restored = ClassSession.objects.filter(date=obj.date, is_cancelled=True).update(is_cancelled=False)
-        super().delete_model(request, obj)
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            restored = restore_holiday_sessions(obj.date, obj.last_date)
+        if restored:
+            messages.info(request, f"Restored {restored} session(s) for {obj}.")
+
+    def delete_queryset(self, request, queryset):
+        holidays = list(queryset)
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            restored = sum(restore_holiday_sessions(h.date, h.last_date) for h in holidays)
         if restored:
-            messages.info(request, f"Restored {restored} session(s) on {obj.date}.")
+            messages.info(request, f"Restored {restored} session(s).")
 
 
 @admin.register(Enrollment)
@@ -368,15 +432,32 @@ class ScheduleAdmin(admin.ModelAdmin):
     list_display = ["course", "day_of_week", "start_time", "end_time", "grace_before_minutes", "grace_after_minutes"]
     list_filter = ["course", "day_of_week"]
 
+    def save_model(self, request, obj, form, change):
+        previous = None
+        if change and set(form.changed_data) & set(SCHEDULE_SLOT_FIELDS):
+            previous = Schedule.objects.get(pk=obj.pk)
+        super().save_model(request, obj, form, change)
+        if previous is not None:
+            result = resync_schedule_sessions(obj, previous)
+            messages.info(request, f"Sessions resynced: {result}.")
+
 
 @admin.register(ClassSession)
 class ClassSessionAdmin(admin.ModelAdmin):
     list_display = ["course", "date", "week_number", "start_time", "end_time", "is_cancelled", "attendance_count"]
     list_filter = ["course", "is_cancelled", "date"]
     search_fields = ["course__code", "course__name"]
-    inlines = [AttendanceRecordInline, ExcusedAbsenceInline]
+    inlines = [AttendanceRecordInline, ExcusedAbsenceInline, NewExcusedAbsenceInline]
     actions = ["export_attendance_csv"]
 
+    def get_queryset(self, request):
+        # Also backs the session autocomplete, whose labels include the course code
+        return super().get_queryset(request).select_related("course").annotate(record_count=Count("records"))
+
+    @admin.display(description="Attendance count", ordering="record_count")
+    def attendance_count(self, obj):
+        return obj.record_count
+
     @admin.action(description="Export attendance CSV for selected sessions")
     def export_attendance_csv(self, request, queryset):
         response = HttpResponse(content_type="text/csv")
@@ -401,6 +482,8 @@ class AttendanceRecordAdmin(ImportExportModelAdmin):
     resource_class = AttendanceRecordResource
     list_display = ["student_id_entered", "session", "ip_address", "timestamp"]
     list_filter = ["session__course", "session__date"]
+    list_select_related = ["session__course"]
+    autocomplete_fields = ["session", "student"]
     search_fields = ["student_id_entered"]
     readonly_fields = ["ip_address", "user_agent", "timestamp"]
 
@@ -409,5 +492,30 @@ class AttendanceRecordAdmin(ImportExportModelAdmin):
 class ExcusedAbsenceAdmin(admin.ModelAdmin):
     list_display = ["student", "session", "reason", "created_at"]
     list_filter = ["session__course", "session__date"]
+    list_select_related = ["student", "session__course"]
     search_fields = ["student__student_id", "student__name", "reason"]
     autocomplete_fields = ["student", "session"]
+
+
+@admin.register(SemesterArchive)
+class SemesterArchiveAdmin(admin.ModelAdmin):
+    list_display = ["semester", "file_format", "sessions", "records", "excused", "purged_at", "path"]
+    readonly_fields = ["semester", "path", "file_format", "sessions", "records", "excused", "purged_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(CourseReportSnapshot)
+class CourseReportSnapshotAdmin(admin.ModelAdmin):
+    list_display = ["course", "created_at"]
+    list_select_related = ["course"]
+    list_filter = ["course__semester"]
+    fields = ["course", "data", "created_at"]
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,361 @@
+"""Archival of closed semesters into compressed per-course files.
+
+Layout under ``ARCHIVE_ROOT``::
+
+    <semester>/manifest.json
+    <semester>/course-<id>/sessions.csv.gz   (or .parquet)
+    <semester>/course-<id>/records.csv.gz
+    <semester>/course-<id>/excuses.csv.gz
+
+Files are partitioned per course so a report only reads its own course.
+Parquet needs pandas with pyarrow; CSV.gz only needs the standard library.
+"""
+
+import csv
+import datetime
+import gzip
+import hashlib
+import importlib.util
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import (
+    AttendanceRecord,
+    AttendanceSummary,
+    ClassSession,
+    Course,
+    Enrollment,
+    ExcusedAbsence,
+    SemesterArchive,
+)
+
+DELETE_CHUNK_SIZE = 5000
+
+TABLES = {
+    "sessions": (
+        ClassSession,
+        "course_id",
+        ("id", "course_id", "date", "week_number", "start_time", "end_time", "is_cancelled"),
+    ),
+    "records": (
+        AttendanceRecord,
+        "session__course_id",
+        (
+            "id", "session_id", "session__course_id", "student_id", "student_id_entered",
+            "ip_address", "user_agent", "timestamp",
+        ),
+    ),
+    "excuses": (
+        ExcusedAbsence,
+        "session__course_id",
+        ("id", "session_id", "session__course_id", "student_id", "reason", "created_at"),
+    ),
+}
+
+# Column converters applied when reading CSV files back
+_PARSERS = {
+    "id": int,
+    "course_id": int,
+    "session_id": int,
+    "session__course_id": int,
+    "student_id": lambda v: int(v) if v else None,
+    "week_number": int,
+    "date": datetime.date.fromisoformat,
+    "start_time": datetime.time.fromisoformat,
+    "end_time": datetime.time.fromisoformat,
+    "is_cancelled": lambda v: v == "True",
+    "timestamp": datetime.datetime.fromisoformat,
+    "created_at": datetime.datetime.fromisoformat,
+}
+
+
+@dataclass
+class ArchiveResult:
+    sessions: int = 0
+    records: int = 0
+    excused: int = 0
+    summaries: int = 0
+    purged: dict = field(default_factory=dict)
+    resumed: bool = False
+
+
+def archive_root():
+    return Path(settings.ARCHIVE_ROOT)
+
+
+def table_path(directory, course_id, table, file_format):
+    return Path(directory) / f"course-{course_id}" / f"{table}.{file_format}"
+
+
+def _write_table(path, columns, rows, file_format):
+    """Write ``rows`` (tuples) to ``path``; return the number of rows written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if file_format == SemesterArchive.FORMAT_PARQUET:
+        import pandas as pd
+
+        frame = pd.DataFrame(list(rows), columns=columns)
+        frame.to_parquet(path, index=False)
+        return len(frame)
+
+    count = 0
+    with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow("" if value is None else value for value in row)
+            count += 1
+    return count
+
+
+def read_table(path, file_format):
+    """Read an archive file back as a list of dicts with Python-typed values."""
+    if file_format == SemesterArchive.FORMAT_PARQUET:
+        import pandas as pd
+
+        frame = pd.read_parquet(path)
+        return [
+            {key: (None if pd.isna(value) else value) for key, value in row.items()}
+            for row in frame.to_dict("records")
+        ]
+
+    with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+        return [
+            {key: _PARSERS[key](value) if key in _PARSERS else value for key, value in row.items()}
+            for row in csv.DictReader(f)
+        ]
+
+
+def _count_rows(path, file_format):
+    if file_format == SemesterArchive.FORMAT_PARQUET:
+        import pandas as pd
+
+        return len(pd.read_parquet(path, columns=["id"]))
+    with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+        return sum(1 for _ in csv.reader(f)) - 1  # minus header
+
+
+def _read_ids(path, file_format):
+    if file_format == SemesterArchive.FORMAT_PARQUET:
+        import pandas as pd
+
+        return set(pd.read_parquet(path, columns=["id"])["id"].tolist())
+    with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+        return {int(row["id"]) for row in csv.DictReader(f)}
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_course_archive(archive, course_id):
+    """Load one archived course as ``{"sessions": [...], "records": [...], "excuses": [...]}``."""
+    return {
+        table: read_table(table_path(archive.path, course_id, table, archive.file_format), archive.file_format)
+        for table in TABLES
+    }
+
+
+def export_semester(semester, directory, file_format=SemesterArchive.FORMAT_CSV_GZ, progress=None):
+    """Write every course's sessions, records and excuses and verify the files.
+
+    Each file is read back and its row count compared with the live table;
+    a mismatch raises ``ValueError`` before anything is deleted.
+
+    Returns:
+        dict: The manifest (also written to ``manifest.json``).
+    """
+    if file_format == SemesterArchive.FORMAT_PARQUET:
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ValueError("Parquet archives need pyarrow installed; use csv.gz instead.")
+
+    directory = Path(directory)
+    course_ids = list(Course.objects.filter(semester=semester).values_list("pk", flat=True))
+    manifest = {"semester": semester, "format": file_format, "created": timezone.now().isoformat(), "files": {}}
+
+    for table, (model, course_field, columns) in TABLES.items():
+        scope = model.objects.filter(**{f"{course_field}__in": course_ids})
+        expected = dict(scope.values(course_field).annotate(n=Count("pk")).values_list(course_field, "n"))
+        for course_id in course_ids:
+            path = table_path(directory, course_id, table, file_format)
+            rows = scope.filter(**{course_field: course_id}).order_by("pk").values_list(*columns).iterator(
+                chunk_size=DELETE_CHUNK_SIZE
+            )
+            written = _write_table(path, columns, rows, file_format)
+            on_disk = _count_rows(path, file_format)
+            if not written == on_disk == expected.get(course_id, 0):
+                raise ValueError(
+                    f"{path}: wrote {written} rows, read back {on_disk}, "
+                    f"expected {expected.get(course_id, 0)}; nothing was deleted."
+                )
+            manifest["files"][str(path.relative_to(directory))] = {"rows": on_disk, "sha256": _sha256(path)}
+        if progress:
+            progress(table, sum(expected.values()))
+
+    (directory / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def store_summaries(semester):
+    """Freeze per-enrollment attendance totals for the semester's courses.
+
+    Returns:
+        int: Number of summaries written.
+    """
+    from apps.portal.services import attendance_stats
+
+    enrollments = Enrollment.objects.filter(course__semester=semester)
+    stats = attendance_stats(enrollments, use_summaries=False)
+    summaries = [
+        AttendanceSummary(
+            enrollment_id=pk,
+            attended=stats[(student_id, course_id)]["attended"],
+            total_sessions=stats[(student_id, course_id)]["total"],
+            excused=stats[(student_id, course_id)]["excused"],
+        )
+        for pk, student_id, course_id in enrollments.values_list("pk", "student_id", "course_id")
+    ]
+    AttendanceSummary.objects.filter(enrollment__in=enrollments).delete()
+    AttendanceSummary.objects.bulk_create(summaries, batch_size=DELETE_CHUNK_SIZE)
+    return len(summaries)
+
+
+def verify_unpurged_rows(archive):
+    """Check that every live row of an exported semester is in its archive files.
+
+    Run before resuming a purge: rows added after the export (e.g. a late
+    excuse) would otherwise be deleted without ever being archived.
+
+    Raises:
+        ValueError: The manifest disagrees with the archive's totals, a file
+            is missing, or live rows are not in the files.
+    """
+    directory = Path(archive.path)
+    try:
+        manifest = json.loads((directory / "manifest.json").read_text())
+    except FileNotFoundError:
+        raise ValueError(f"{directory}: manifest.json is missing; nothing was deleted.") from None
+
+    totals = {table: 0 for table in TABLES}
+    for name, info in manifest["files"].items():
+        totals[Path(name).name.split(".")[0]] += info["rows"]
+    expected = {"sessions": archive.sessions, "records": archive.records, "excuses": archive.excused}
+    if totals != expected:
+        raise ValueError(f"{directory}: manifest rows {totals} do not match the archive {expected}.")
+
+    course_ids = list(Course.objects.filter(semester=archive.semester).values_list("pk", flat=True))
+    for table, (model, course_field, _) in TABLES.items():
+        archived = set()
+        for course_id in course_ids:
+            path = table_path(directory, course_id, table, archive.file_format)
+            if not path.exists():
+                raise ValueError(f"{path} is missing; nothing was deleted.")
+            archived |= _read_ids(path, archive.file_format)
+        live = set(model.objects.filter(**{f"{course_field}__in": course_ids}).values_list("pk", flat=True))
+        if len(live) > expected[table] or live - archived:
+            raise ValueError(
+                f"Semester {archive.semester}: {len(live - archived)} live {table} row(s) were added after the "
+                f"export ({len(live)} live, {expected[table]} archived). Delete its SemesterArchive entry and run "
+                "again to re-export. Nothing was deleted."
+            )
+
+
+def purge_semester(semester, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete the semester's records, excuses and sessions in pk-ordered chunks.
+
+    Each chunk is its own short transaction, so the live tables are never
+    locked for the whole purge and an interrupted run can simply resume.
+
+    Returns:
+        dict: ``{table: rows_deleted}``
+    """
+    deleted = {}
+    for table, (model, course_field, _) in reversed(list(TABLES.items())):  # children before sessions
+        scope = model.objects.filter(**{f"{course_field.removesuffix('_id')}__semester": semester})
+        deleted[table] = 0
+        while True:
+            pks = list(scope.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                chunk = model.objects.filter(pk__in=pks)
+                deleted[table] += chunk._raw_delete(chunk.db)
+    return deleted
+
+
+def archive_semester(
+    semester,
+    directory=None,
+    file_format=SemesterArchive.FORMAT_CSV_GZ,
+    chunk_size=DELETE_CHUNK_SIZE,
+    purge=True,
+    force=False,
+    progress=None,
+):
+    """Export, verify, summarize and (optionally) purge a closed semester.
+
+    Re-running on a semester that was exported but not purged skips the
+    export and only finishes the purge, after checking that no live row
+    was added since the export.
+
+    Raises:
+        ValueError: Unknown semester, sessions still ahead (without
+            ``force``), already purged, or a verification mismatch.
+
+    Returns:
+        ArchiveResult
+    """
+    if not Course.objects.filter(semester=semester).exists():
+        raise ValueError(f"No courses in semester {semester}.")
+
+    result = ArchiveResult()
+    archive = SemesterArchive.objects.filter(semester=semester).first()
+    if archive and archive.purged_at:
+        raise ValueError(f"Semester {semester} is already archived in {archive.path}.")
+
+    if archive is None:
+        last_session = ClassSession.objects.filter(course__semester=semester).aggregate(last=Max("date"))["last"]
+        if last_session and last_session >= timezone.localdate() and not force:
+            raise ValueError(f"Semester {semester} still has sessions on or after today ({last_session}).")
+
+        directory = Path(directory or archive_root() / semester)
+        manifest = export_semester(semester, directory, file_format, progress)
+        totals = {table: 0 for table in TABLES}
+        for name, info in manifest["files"].items():
+            totals[Path(name).name.split(".")[0]] += info["rows"]
+
+        with transaction.atomic():
+            result.summaries = store_summaries(semester)
+            archive = SemesterArchive.objects.create(
+                semester=semester,
+                path=str(directory),
+                file_format=file_format,
+                sessions=totals["sessions"],
+                records=totals["records"],
+                excused=totals["excuses"],
+            )
+    else:
+        result.resumed = True
+        if purge:
+            verify_unpurged_rows(archive)
+
+    result.sessions, result.records, result.excused = archive.sessions, archive.records, archive.excused
+    if purge:
+        result.purged = purge_semester(semester, chunk_size)
+        archive.purged_at = timezone.now()
+        archive.save(update_fields=["purged_at", "updated_at"])
+    return result
+
+
+def archived_semesters():
+    """Set of semester names whose attendance lives in archive files."""
+    return set(SemesterArchive.objects.values_list("semester", flat=True))
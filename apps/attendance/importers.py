@@ -1,98 +1,306 @@
-"""Shared import utilities for UBYS student list files."""
+"""Shared import utilities for UBYS student list files and grade CSVs."""
 
-import pandas as pd
+import codecs
+import csv
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 from .models import Enrollment, Student
 
+HEADER_LABEL = "Öğrenci No"
+HEADER_SCAN_ROWS = 16  # UBYS puts the column header within the first ~15 rows
+COURSE_CODE_SCAN_ROWS = 6
+FALLBACK_COLUMNS = (4, 5)
+BULK_BATCH_SIZE = 500
 
-def parse_ubys_student_list(file_obj):
-    """Parse a UBYS .xls attendance list and return student data.
 
-    Dynamically detects column positions by finding the header row
-    containing "Öğrenci No", since UBYS exports vary in layout.
+@dataclass
+class UbysRoster:
+    """Result of parsing one UBYS export: students plus header metadata."""
+
+    students: list = field(default_factory=list)
+    course_code: str | None = None
+    section: str | None = None
+    metadata: dict = field(default_factory=dict)
+
+
+def read_ubys_sheet(file_obj):
+    """Read the first sheet of a UBYS export as a raw, header-less frame."""
+    # pandas is imported lazily so web workers don't pay for it at boot
+    import pandas as pd
+
+    return pd.read_excel(file_obj, header=None, dtype=object)
+
+
+def parse_ubys_file(file_obj):
+    """Parse a UBYS .xls attendance list in a single pass.
 
     Args:
         file_obj: A file path (str) or file-like object readable by pandas.
 
     Returns:
-        list[tuple[str, str]]: List of (student_id, name) tuples.
+        UbysRoster: students, detected course code/section and metadata.
     """
-    df = pd.read_excel(file_obj)
-
-    # Find the header row and column positions
-    id_col = None
-    name_col = None
-    header_row = None
-
-    for i in range(min(15, len(df))):
-        for j in range(df.shape[1]):
-            val = df.iloc[i, j]
-            if pd.notna(val) and "Öğrenci No" in str(val):
-                id_col = j
-                header_row = i
-                break
-        if header_row is not None:
-            break
+    return parse_ubys_frame(read_ubys_sheet(file_obj))
+
 
+def parse_ubys_frame(df):
+    """Extract students and course code from an already-read UBYS sheet.
+
+    Dynamically detects column positions by finding the header row
+    containing "Öğrenci No", since UBYS exports vary in layout. Repeated
+    page/section headers in multi-section exports are dropped by the
+    numeric student-id mask.
+
+    Args:
+        df: DataFrame as returned by ``read_ubys_sheet`` (no header row).
+
+    Returns:
+        UbysRoster
+    """
+    roster = UbysRoster()
+    if df.empty:
+        roster.metadata = {"header_row": None, "id_col": None, "name_col": None, "rows": 0, "skipped_rows": 0}
+        return roster
+
+    header_row, id_col = _find_header(df)
     if header_row is None:
         # Fallback: assume columns 4 and 5
-        id_col, name_col = 4, 5
-        header_row = -1
+        id_col, name_col = FALLBACK_COLUMNS
+        first_data_row = 0
     else:
         # Name is in the next column after student_id in the actual data rows
         # (header label may span merged cells, so detect from first data row)
         name_col = id_col + 1
+        first_data_row = header_row + 1
 
     students = []
-    for i in range(header_row + 1, len(df)):
-        student_id = df.iloc[i, id_col]
-        name = df.iloc[i, name_col]
+    if name_col < df.shape[1]:
+        students = _extract_students(df.iloc[first_data_row:, [id_col, name_col]])
 
-        if pd.isna(student_id) or pd.isna(name):
-            continue
+    roster.students = students
+    roster.course_code, roster.section = _find_course_code(df)
+    roster.metadata = {
+        "header_row": header_row,
+        "id_col": id_col,
+        "name_col": name_col,
+        "rows": len(df),
+        "skipped_rows": len(df) - first_data_row - len(students),
+    }
+    return roster
 
-        student_id = (
-            str(int(student_id)) if isinstance(student_id, float) else str(student_id).strip()
-        )
-        name = str(name).strip()
 
-        # Skip non-data rows
-        if not student_id.isdigit():
-            continue
+def _find_header(df):
+    """Return (row, col) of the first "Öğrenci No" cell, or (None, None)."""
+    head = df.iloc[:HEADER_SCAN_ROWS].astype("string")
+    mask = head.apply(lambda col: col.str.contains(HEADER_LABEL, regex=False, na=False))
+    hits = mask.to_numpy().nonzero()  # row-major order, like scanning row by row
+    if not len(hits[0]):
+        return None, None
+    return int(hits[0][0]), int(hits[1][0])
 
-        students.append((student_id, name))
 
-    return students
+def _extract_students(data):
+    """Vectorized row filtering: drop NaNs, normalise float ids, keep numeric ids."""
+    data = data.dropna()
+    ids = (
+        data.iloc[:, 0]
+        .astype("string")
+        .str.strip()
+        .str.replace(r"\.0+$", "", regex=True)  # 2021001.0 -> 2021001
+    )
+    names = data.iloc[:, 1].astype("string").str.strip()
+
+    # Skip non-data rows (repeated headers, totals, page footers)
+    valid = ids.str.isdigit().fillna(False).astype(bool)
+    return list(zip(ids[valid].tolist(), names[valid].tolist()))
+
+
+def _find_course_code(df):
+    """Find the "CODE\\nSECTION" cell UBYS places in the header area."""
+    import pandas as pd
+
+    cells = pd.Series(df.iloc[:COURSE_CODE_SCAN_ROWS].to_numpy().ravel()).astype("string")
+    multiline = cells[cells.str.contains("\n", regex=False, na=False)]
+    if multiline.empty:
+        return None, None
+
+    parts = multiline.str.split("\n")
+    codes = parts.str[0].str.strip()
+    valid = (codes.str.len() >= 4) & codes.str.contains(r"\d", regex=True)
+    if not valid.any():
+        return None, None
+
+    first = valid.to_numpy().nonzero()[0][0]
+    section = parts.iloc[first][1].strip() if len(parts.iloc[first]) > 1 else ""
+    return codes.iloc[first], section or None
+
+
+def parse_ubys_student_list(file_obj):
+    """Parse a UBYS .xls attendance list and return student data.
+
+    Args:
+        file_obj: A file path (str) or file-like object readable by pandas.
+
+    Returns:
+        list[tuple[str, str]]: List of (student_id, name) tuples.
+    """
+    return parse_ubys_file(file_obj).students
 
 
 def detect_course_code(file_obj):
     """Try to detect a course code from the UBYS header area.
 
+    Prefer ``parse_ubys_file`` when the students are needed too, so the
+    file is only read once.
+
     Args:
         file_obj: A file path (str) or file-like object readable by pandas.
 
     Returns:
         str or None: The detected course code, or None.
     """
-    df = pd.read_excel(file_obj)
-
-    for i in range(min(5, len(df))):
-        for j in range(len(df.columns)):
-            val = df.iloc[i, j]
-            if pd.isna(val):
-                continue
-            val = str(val)
-            # UBYS format: "IMT412\n1" (code + section)
-            if "\n" in val:
-                code = val.split("\n")[0].strip()
-                if len(code) >= 4 and any(c.isdigit() for c in code):
-                    return code
-    return None
+    return parse_ubys_file(file_obj).course_code
+
+
+@dataclass
+class RosterDiff:
+    """Change set for importing one or more rosters, computed with set operations.
+
+    All values are plain ids and strings so a diff can be stored in a
+    session or cache and applied later without re-parsing the files.
+    """
+
+    new_students: dict = field(default_factory=dict)  # student_id -> name
+    renamed_students: dict = field(default_factory=dict)  # student_id -> [old_name, new_name]
+    new_enrollments: dict = field(default_factory=dict)  # course_id -> [student_id, ...]
+    missing_enrollments: dict = field(default_factory=dict)  # course_id -> [student_id, ...]
+
+    @property
+    def is_empty(self):
+        return not (self.new_students or self.renamed_students or any(self.new_enrollments.values()))
+
+    def to_dict(self):
+        return {
+            "new_students": self.new_students,
+            "renamed_students": self.renamed_students,
+            # JSON object keys must be strings
+            "new_enrollments": {str(k): v for k, v in self.new_enrollments.items()},
+            "missing_enrollments": {str(k): v for k, v in self.missing_enrollments.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            new_students=dict(data["new_students"]),
+            renamed_students={k: list(v) for k, v in data["renamed_students"].items()},
+            new_enrollments={int(k): list(v) for k, v in data["new_enrollments"].items()},
+            missing_enrollments={int(k): list(v) for k, v in data["missing_enrollments"].items()},
+        )
+
+
+def plan_roster_import(rosters):
+    """Diff parsed rosters against the database in two queries.
+
+    Args:
+        rosters: Iterable of (course, students) pairs, where students is a
+            list of (student_id, name) tuples. The same course may appear
+            more than once (e.g. one file per section); its lists are merged.
+
+    Returns:
+        RosterDiff
+    """
+    names = {}
+    wanted = {}
+    for course, students in rosters:
+        ids = wanted.setdefault(course.pk, set())
+        for student_id, name in students:
+            names[student_id] = name
+            ids.add(student_id)
+
+    existing_names = dict(
+        Student.objects.filter(student_id__in=names).values_list("student_id", "name")
+    )
+    enrolled = {}
+    for course_id, student_id in Enrollment.objects.filter(course_id__in=wanted).values_list(
+        "course_id", "student__student_id"
+    ):
+        enrolled.setdefault(course_id, set()).add(student_id)
+
+    diff = RosterDiff()
+    for student_id in sorted(names.keys() - existing_names.keys()):
+        diff.new_students[student_id] = names[student_id]
+    for student_id in sorted(names.keys() & existing_names.keys()):
+        if names[student_id] != existing_names[student_id]:
+            diff.renamed_students[student_id] = [existing_names[student_id], names[student_id]]
+    for course_id, ids in wanted.items():
+        current = enrolled.get(course_id, set())
+        diff.new_enrollments[course_id] = sorted(ids - current)
+        diff.missing_enrollments[course_id] = sorted(current - ids)
+    return diff
+
+
+@transaction.atomic
+def apply_roster_diff(diff, update_names=False, batch_size=BULK_BATCH_SIZE):
+    """Write a RosterDiff with bulk inserts/updates.
+
+    Students missing from a new list are only reported, never unenrolled.
+    Existing students keep their stored name unless ``update_names`` is set.
+    Rows that already exist (e.g. written by a concurrent import since the
+    diff was planned) are skipped and not counted as created.
+
+    Returns:
+        tuple[int, int, int]: (created_students, renamed_students, created_enrollments)
+    """
+    new_ids = list(diff.new_students)
+    existing = Student.objects.filter(student_id__in=new_ids)
+    before = existing.count()
+    Student.objects.bulk_create(
+        [Student(student_id=sid, name=name) for sid, name in diff.new_students.items()],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    created_students = existing.count() - before
+
+    renamed = 0
+    if update_names and diff.renamed_students:
+        to_update = list(Student.objects.filter(student_id__in=diff.renamed_students))
+        now = timezone.now()
+        for student in to_update:
+            student.name = diff.renamed_students[student.student_id][1]
+            student.updated_at = now  # bulk_update skips auto_now
+        renamed = Student.objects.bulk_update(to_update, ["name", "updated_at"], batch_size=batch_size)
+
+    enrolling = {sid for ids in diff.new_enrollments.values() for sid in ids}
+    pks = dict(Student.objects.filter(student_id__in=enrolling).values_list("student_id", "pk"))
+    enrollments = [
+        Enrollment(course_id=course_id, student_id=pks[sid])
+        for course_id, ids in diff.new_enrollments.items()
+        for sid in ids
+        if sid in pks
+    ]
+    created_enrollments = 0
+    if enrollments:
+        targets = Q()
+        for course_id, ids in diff.new_enrollments.items():
+            targets |= Q(course_id=course_id, student_id__in=[pks[sid] for sid in ids if sid in pks])
+        existing = Enrollment.objects.filter(targets)
+        before = existing.count()
+        Enrollment.objects.bulk_create(enrollments, batch_size=batch_size, ignore_conflicts=True)
+        created_enrollments = existing.count() - before
+
+    return created_students, renamed, created_enrollments
 
 
 def import_students_to_course(course, students):
     """Create Student records and Enrollment links for a course.
 
+    Existing students keep their stored name.
+
     Args:
         course: A Course instance.
         students: list[tuple[str, str]] — (student_id, name) pairs.
@@ -100,22 +308,81 @@ def import_students_to_course(course, students):
     Returns:
         tuple[int, int]: (created_students, created_enrollments)
     """
-    created_students = 0
-    created_enrollments = 0
+    diff = plan_roster_import([(course, students)])
+    created_students, _, created_enrollments = apply_roster_diff(diff, update_names=False)
+    return created_students, created_enrollments
 
-    for student_id, name in students:
-        student, created = Student.objects.get_or_create(
-            student_id=student_id,
-            defaults={"name": name},
-        )
-        if created:
-            created_students += 1
 
-        _, enrolled = Enrollment.objects.get_or_create(
-            student=student,
-            course=course,
-        )
-        if enrolled:
-            created_enrollments += 1
+GRADE_FIELDS = ("midterm", "final")
 
-    return created_students, created_enrollments
+
+@transaction.atomic
+def import_grades_csv(course, file_obj, chunk_size=BULK_BATCH_SIZE):
+    """Stream a ``student_id,midterm,final`` CSV into a course's enrollments.
+
+    The file is decoded line by line, enrollments are loaded with one query
+    and changed rows are written with ``bulk_update`` every ``chunk_size``
+    enrollments. Empty cells keep the existing grade.
+
+    Args:
+        course: A Course instance.
+        file_obj: A binary file-like object (e.g. an UploadedFile).
+
+    Returns:
+        dict: ``updated`` row count, ``skipped`` student ids that are not
+        enrolled and per-row ``errors``.
+    """
+    enrollments = {
+        e.student.student_id: e
+        for e in Enrollment.objects.filter(course=course)
+        .select_related("student")
+        .only("id", "midterm_grade", "final_grade", "student__student_id")
+    }
+    fields = [f"{name}_grade" for name in GRADE_FIELDS] + ["updated_at"]
+    now = timezone.now()
+
+    updated = 0
+    skipped = []
+    errors = []
+    pending = {}
+
+    reader = csv.DictReader(codecs.iterdecode(file_obj, "utf-8-sig"))
+    for i, row in enumerate(reader, start=2):  # row 1 is header
+        student_id = (row.get("student_id") or "").strip()
+        if not student_id:
+            errors.append(f"Row {i}: missing student_id")
+            continue
+
+        enrollment = enrollments.get(student_id)
+        if enrollment is None:
+            skipped.append(student_id)
+            continue
+
+        changed = False
+        for grade_field in GRADE_FIELDS:
+            val = (row.get(grade_field) or "").strip()
+            if val:
+                try:
+                    grade = Decimal(val)
+                except InvalidOperation:
+                    errors.append(f"Row {i}: invalid {grade_field} value '{val}'")
+                    continue
+                setattr(enrollment, f"{grade_field}_grade", grade)
+                changed = True
+
+        if changed:
+            enrollment.updated_at = now
+            pending[enrollment.pk] = enrollment
+            updated += 1
+            if len(pending) >= chunk_size:
+                Enrollment.objects.bulk_update(pending.values(), fields)
+                pending.clear()
+
+    if pending:
+        Enrollment.objects.bulk_update(pending.values(), fields)
+
+    return {
+        "updated": updated,
+        "skipped": skipped,
+        "errors": errors,
+    }
@@ -1,13 +1,21 @@
-import csv
-import io
-from decimal import Decimal, InvalidOperation
-
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count, Q
-from django.http import HttpResponse
+from django.db.models import Count
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404, render
-
-from .models import AttendanceRecord, ClassSession, Course, CourseMaterial, Enrollment, ExcusedAbsence
+from django.utils.cache import parse_etags
+
+from .importers import import_grades_csv
+from .models import Course, CourseMaterial
+from .qr import DEFAULT_BOX_SIZE, MAX_BOX_SIZE, QR_CONTENT_TYPES, render_qr, scan_path
+from .reports import (
+    EXPORT_FORMATS,
+    course_dashboard,
+    course_matrix,
+    finalized_snapshot,
+    matrix_export,
+    snapshot_matrix,
+)
+from .scheduling import held_sessions
 
 
 def _course_context(course, view_name):
@@ -20,7 +28,7 @@ def instructor_course_list(request):
     """List all courses with student counts."""
     courses = Course.objects.annotate(
         student_count=Count("enrollments", distinct=True),
-        session_count=Count("sessions", filter=Q(sessions__is_cancelled=False), distinct=True),
+        session_count=Count("sessions", filter=held_sessions("sessions__"), distinct=True),
     ).order_by("-semester", "code")
     return render(request, "instructor/course_list.html", {
         "courses": courses,
@@ -33,52 +41,11 @@ def instructor_course_dashboard(request, course_id):
     """Instructor dashboard with summary, at-risk students, and quick actions."""
     course = get_object_or_404(Course, pk=course_id)
 
-    sessions = ClassSession.objects.filter(course=course, is_cancelled=False)
-    total_sessions = sessions.count()
-    enrollments = Enrollment.objects.filter(course=course).select_related("student")
-    total_students = enrollments.count()
-
-    attendance_records = set(
-        AttendanceRecord.objects.filter(
-            session__course=course, session__is_cancelled=False, student__isnull=False
-        ).values_list("student_id", "session_id")
-    )
-    excused_records = set(
-        ExcusedAbsence.objects.filter(
-            session__course=course, session__is_cancelled=False
-        ).values_list("student_id", "session_id")
-    )
-
-    student_stats = []
-    total_pct_sum = 0
-    for enrollment in enrollments:
-        student = enrollment.student
-        attended = sum(1 for s in sessions if (student.pk, s.pk) in attendance_records)
-        excused = sum(1 for s in sessions if (student.pk, s.pk) in excused_records)
-        effective = total_sessions - excused
-        pct = round(attended / effective * 100) if effective > 0 else 0
-        total_pct_sum += pct
-        student_stats.append({
-            "student": student,
-            "attended": attended,
-            "excused": excused,
-            "effective_total": effective,
-            "percentage": pct,
-        })
-
-    avg_attendance = round(total_pct_sum / total_students) if total_students > 0 else 0
-    at_risk = sorted(
-        [s for s in student_stats if s["percentage"] < 60],
-        key=lambda x: x["percentage"],
-    )
+    snapshot = finalized_snapshot(course)
+    dashboard = snapshot.data["dashboard"] if snapshot else course_dashboard(course)
 
     ctx = _course_context(course, "dashboard")
-    ctx.update({
-        "total_students": total_students,
-        "total_sessions": total_sessions,
-        "avg_attendance": avg_attendance,
-        "at_risk": at_risk,
-    })
+    ctx.update(dashboard)
     return render(request, "instructor/dashboard.html", ctx)
 
 
@@ -86,54 +53,18 @@ def instructor_course_dashboard(request, course_id):
 def instructor_attendance_matrix(request, course_id):
     """Show attendance matrix: students x sessions."""
     course = get_object_or_404(Course, pk=course_id)
-    sessions = ClassSession.objects.filter(course=course, is_cancelled=False).order_by("date", "start_time")
-    enrollments = Enrollment.objects.filter(course=course).select_related("student").order_by("student__student_id")
-
-    records = AttendanceRecord.objects.filter(session__in=sessions).values_list(
-        "student_id_entered", "session_id"
-    )
-    attendance_set = {(sid, sess_id) for sid, sess_id in records}
-
-    excused_set = set(
-        ExcusedAbsence.objects.filter(
-            session__in=sessions
-        ).values_list("student_id", "session_id")
-    )
-
-    rows = []
-    for enrollment in enrollments:
-        student = enrollment.student
-        attendance = []
-        for session in sessions:
-            if (student.pk, session.pk) in excused_set:
-                attendance.append("E")
-            elif (student.student_id, session.id) in attendance_set:
-                attendance.append("P")
-            else:
-                attendance.append("A")
-        rows.append({
-            "student": student,
-            "attendance": attendance,
-            "total": sum(1 for a in attendance if a == "P"),
-        })
-
     export = request.GET.get("export")
-    if export == "csv":
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = f'attachment; filename="{course.code}_attendance.csv"'
-        writer = csv.writer(response)
-        header = ["Student ID", "Name"] + [f"W{s.week_number} ({s.date})" for s in sessions] + ["Total"]
-        writer.writerow(header)
-        for row in rows:
-            writer.writerow(
-                [row["student"].student_id, row["student"].name]
-                + row["attendance"]
-                + [row["total"]]
-            )
+    if export in EXPORT_FORMATS:
+        content, content_type, filename = matrix_export(course, export)
+        response = HttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
         return response
 
+    snapshot = finalized_snapshot(course)
+    sessions, rows = snapshot_matrix(snapshot) if snapshot else course_matrix(course)
+
     ctx = _course_context(course, "matrix")
-    ctx.update({"sessions": sessions, "rows": rows})
+    ctx.update({"sessions": sessions, "rows": rows, "finalized": snapshot and snapshot.created_at})
     return render(request, "instructor/attendance_matrix.html", ctx)
 
 
@@ -141,12 +72,37 @@ def instructor_attendance_matrix(request, course_id):
 def instructor_qr_code(request, course_id):
     """Display a printable QR code page for a course."""
     course = get_object_or_404(Course, pk=course_id)
-    scan_url = request.build_absolute_uri(f"/a/{course.qr_token}/")
+    scan_url = request.build_absolute_uri(scan_path(course))
     ctx = _course_context(course, "qr")
     ctx["scan_url"] = scan_url
     return render(request, "instructor/qr_code.html", ctx)
 
 
+@staff_member_required(login_url="/accounts/login/")
+def instructor_qr_image(request, course_id, fmt):
+    """Render a course's QR code as SVG or PNG, cached and served with a strong ETag."""
+    if fmt not in QR_CONTENT_TYPES:
+        raise Http404("Unknown QR format")
+    try:
+        box_size = min(max(int(request.GET.get("size", DEFAULT_BOX_SIZE)), 1), MAX_BOX_SIZE)
+    except ValueError:
+        box_size = DEFAULT_BOX_SIZE
+
+    course = get_object_or_404(Course.objects.only("qr_token"), pk=course_id)
+    content, etag = render_qr(request.build_absolute_uri(scan_path(course)), box_size, fmt)
+
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=QR_CONTENT_TYPES[fmt])
+        if request.GET.get("download"):
+            response["Content-Disposition"] = f'attachment; filename="{course_id}_qr.{fmt}"'
+    response["ETag"] = etag
+    # The token never changes, so the image is immutable; private because it's staff-only
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
 @staff_member_required(login_url="/accounts/login/")
 def instructor_import_grades(request, course_id):
     """Upload CSV to bulk-update midterm/final grades for a course."""
@@ -154,47 +110,7 @@ def instructor_import_grades(request, course_id):
     results = None
 
     if request.method == "POST" and request.FILES.get("csv_file"):
-        csv_file = request.FILES["csv_file"]
-        decoded = csv_file.read().decode("utf-8-sig")
-        reader = csv.DictReader(io.StringIO(decoded))
-
-        updated = 0
-        skipped = []
-        errors = []
-
-        for i, row in enumerate(reader, start=2):
-            student_id = row.get("student_id", "").strip()
-            if not student_id:
-                errors.append(f"Row {i}: missing student_id")
-                continue
-
-            try:
-                enrollment = Enrollment.objects.get(student__student_id=student_id, course=course)
-            except Enrollment.DoesNotExist:
-                skipped.append(student_id)
-                continue
-
-            changed = False
-            for field in ("midterm", "final"):
-                val = row.get(field, "").strip()
-                if val:
-                    try:
-                        grade = Decimal(val)
-                    except InvalidOperation:
-                        errors.append(f"Row {i}: invalid {field} value '{val}'")
-                        continue
-                    setattr(enrollment, f"{field}_grade", grade)
-                    changed = True
-
-            if changed:
-                enrollment.save()
-                updated += 1
-
-        results = {
-            "updated": updated,
-            "skipped": skipped,
-            "errors": errors,
-        }
+        results = import_grades_csv(course, request.FILES["csv_file"])
 
     ctx = _course_context(course, "grades")
     ctx["results"] = results
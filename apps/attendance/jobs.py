@@ -0,0 +1,76 @@
+"""Background job handlers for long course admin operations (see ``apps.core.jobs``)."""
+
+from apps.core.jobs import job_handler, report, save_result_file
+
+from .importers import RosterDiff, apply_roster_diff
+from .models import Course
+from .reports import attendance_summary_csv
+from .scheduling import delete_empty_sessions, get_holiday_dates, sync_course_sessions
+
+
+def _sync_message(course, result):
+    parts = []
+    if result.created:
+        parts.append(f"Generated {result.created} class sessions for {course.total_weeks} weeks.")
+    if result.skipped:
+        parts.append(f"Skipped {result.skipped} session(s) on holidays.")
+    if result.cancelled:
+        parts.append(f"Cancelled {result.cancelled} existing session(s) on holidays.")
+    return " ".join(parts) or f"{course.code}: sessions already up to date."
+
+
+@job_handler("attendance.sync_sessions")
+def sync_sessions_job(job, course_id, skip_schedule_ids=()):
+    """Create the semester's sessions after a course (and its schedules) was saved."""
+    course = Course.objects.get(pk=course_id)
+    schedules = [s for s in course.schedules.all() if s.pk not in set(skip_schedule_ids)]
+    if not schedules or not course.semester_start_date:
+        return {"messages": [f"{course.code}: nothing to generate."]}
+    result = sync_course_sessions(course, schedules=schedules)
+    return {"messages": [_sync_message(course, result)]}
+
+
+@job_handler("attendance.regenerate_sessions")
+def regenerate_sessions_job(job, course_ids):
+    """Delete empty sessions and recreate them from the current schedules."""
+    holiday_dates = get_holiday_dates()
+    courses = list(Course.objects.filter(pk__in=course_ids).prefetch_related("schedules").order_by("code"))
+    lines = []
+    for n, course in enumerate(courses, 1):
+        schedules = list(course.schedules.all())
+        if not course.semester_start_date:
+            lines.append(f"{course.code}: no semester start date set, skipped.")
+        elif not schedules:
+            lines.append(f"{course.code}: no schedules defined, skipped.")
+        else:
+            deleted = delete_empty_sessions([course])
+            result = sync_course_sessions(course, schedules=schedules, holiday_dates=holiday_dates)
+            line = f"{course.code}: deleted {deleted} empty sessions, created {result.created} new sessions."
+            if result.skipped:
+                line += f" Skipped {result.skipped} holiday(s)."
+            lines.append(line)
+        report(job, n, len(courses), course.code)
+    return {"messages": lines}
+
+
+@job_handler("attendance.apply_roster")
+def apply_roster_job(job, diff, students, update_names=False):
+    """Phase two of a roster upload: write the previewed diff."""
+    created_students, renamed, created_enrollments = apply_roster_diff(
+        RosterDiff.from_dict(diff), update_names=update_names
+    )
+    lines = [
+        f"Imported {students} students: {created_students} new students, {created_enrollments} new enrollments."
+    ]
+    if renamed:
+        lines.append(f"Renamed {renamed} student(s).")
+    return {"messages": lines}
+
+
+@job_handler("attendance.export_matrix")
+def export_matrix_job(job, course_id):
+    """Build the course's attendance CSV and attach it to the job."""
+    course = Course.objects.get(pk=course_id)
+    content = attendance_summary_csv(course, progress=lambda done, total: report(job, done, total, "Writing rows"))
+    save_result_file(job, f"{course.code}_attendance.csv", content)
+    return {"messages": [f"Exported attendance for {course.code}."]}
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.archive import DELETE_CHUNK_SIZE, archive_semester
+from apps.attendance.models import SemesterArchive
+
+
+class Command(BaseCommand):
+    help = (
+        "Export a closed semester's sessions, attendance and excuses to compressed per-course files, "
+        "freeze per-student totals, then purge the rows from the live tables"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("semester", help='Semester name, e.g. "2024-Fall"')
+        parser.add_argument(
+            "--format",
+            choices=[choice for choice, _ in SemesterArchive.FORMAT_CHOICES],
+            default=SemesterArchive.FORMAT_CSV_GZ,
+        )
+        parser.add_argument("--output-dir", help="Directory for the files (default: ARCHIVE_ROOT/<semester>)")
+        parser.add_argument("--chunk-size", type=int, default=DELETE_CHUNK_SIZE, help="Rows deleted per transaction")
+        parser.add_argument("--force", action="store_true", help="Archive even if sessions remain today or later")
+        parser.add_argument("--no-purge", action="store_true", help="Export and verify only; keep the live rows")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        def progress(table, rows):
+            self.stdout.write(f"  {table}: {rows} rows exported and verified")
+
+        try:
+            result = archive_semester(
+                options["semester"],
+                directory=options["output_dir"],
+                file_format=options["format"],
+                chunk_size=options["chunk_size"],
+                purge=not options["no_purge"],
+                force=options["force"],
+                progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - start
+        if result.resumed:
+            self.stdout.write("Archive already written; finishing the purge.")
+        else:
+            self.stdout.write(
+                f"Archived {result.sessions} sessions, {result.records} records and {result.excused} excused "
+                f"absences; froze {result.summaries} enrollment summaries."
+            )
+        if result.purged:
+            purged = ", ".join(f"{rows} {table}" for table, rows in result.purged.items())
+            self.stdout.write(f"Purged {purged}.")
+        self.stdout.write(self.style.SUCCESS(f"Done in {elapsed:.1f}s."))
@@ -0,0 +1,103 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from apps.attendance.models import AttendanceRecord, ClassSession, Course, ExcusedAbsence, Student
+from apps.attendance.scheduling import delete_empty_sessions
+
+
+class _Rollback(Exception):
+    pass
+
+
+def seed_course(students, weeks, slots, attended_weeks, rate, rng):
+    """Create one course with a full semester of sessions; records only for past weeks."""
+    course = Course.objects.create(code="BENCH999", name="Pruning benchmark", semester="bench")
+    start = datetime.date(2025, 2, 17)
+    sessions = ClassSession.objects.bulk_create([
+        ClassSession(
+            course=course,
+            date=start + datetime.timedelta(weeks=week, days=slot),
+            week_number=week + 1,
+            start_time=datetime.time(9 + slot),
+            end_time=datetime.time(10 + slot),
+        )
+        for week in range(weeks)
+        for slot in range(slots)
+    ])
+    # SQLite and PostgreSQL both return pks from bulk_create
+    people = Student.objects.bulk_create([
+        Student(student_id=f"B{n:08d}", name=f"Bench Student {n}") for n in range(students)
+    ])
+
+    records = []
+    excuses = []
+    for session in sessions:
+        if session.week_number > attended_weeks:
+            continue
+        for student in people:
+            roll = rng.random()
+            if roll < rate:
+                records.append(AttendanceRecord(
+                    session=session,
+                    student=student,
+                    student_id_entered=student.student_id,
+                    ip_address=f"10.{student.pk % 250}.{student.pk // 250 % 250}.1",
+                ))
+            elif roll < rate + 0.01:
+                excuses.append(ExcusedAbsence(session=session, student=student, reason="Medical report"))
+    AttendanceRecord.objects.bulk_create(records, batch_size=2000)
+    ExcusedAbsence.objects.bulk_create(excuses, batch_size=2000)
+    return course, len(sessions), len(records)
+
+
+def legacy_prune(course):
+    """The previous annotate(Count) + count() + delete() implementation (baseline)."""
+    empty = ClassSession.objects.filter(course=course).annotate(
+        record_count=Count("records")
+    ).filter(record_count=0)
+    deleted = empty.count()
+    empty.delete()
+    return deleted
+
+
+class Command(BaseCommand):
+    help = "Benchmark empty-session pruning on a course with a full semester of records (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=150)
+        parser.add_argument("--weeks", type=int, default=14)
+        parser.add_argument("--slots", type=int, default=3, help="Sessions per week")
+        parser.add_argument("--attended-weeks", type=int, default=10, help="Weeks that already have records")
+        parser.add_argument("--rate", type=float, default=0.8, help="Attendance rate")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                course, sessions, records = seed_course(
+                    options["students"], options["weeks"], options["slots"],
+                    options["attended_weeks"], options["rate"], random.Random(options["seed"]),
+                )
+                self.stdout.write(f"Seeded {sessions} sessions and {records} records (rolled back afterwards)")
+
+                for label, prune in (("annotate(Count) + delete()", legacy_prune),
+                                     ("~Exists + raw delete", lambda c: delete_empty_sessions([c]))):
+                    sid = transaction.savepoint()
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        deleted = prune(course)
+                        elapsed = time.perf_counter() - start
+                    transaction.savepoint_rollback(sid)
+                    self.stdout.write(
+                        f"  {label:<28} {elapsed * 1000:8.1f} ms  {len(queries):3d} queries  "
+                        f"deleted {deleted}"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,90 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+# What a gunicorn worker does before serving its first request: set up Django,
+# build the WSGI handler and import the URLconf (which imports every view and
+# admin module).
+WORKER_BOOT = """
+import resource
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns
+with open("/proc/self/status") as f:
+    rss = next((line.split()[1] for line in f if line.startswith("VmRSS:")), 0)
+print("RSS_KB", rss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+HEAVY_MODULES = ("pandas", "numpy", "qrcode", "PIL", "openpyxl")
+
+
+def boot_worker():
+    """Boot one simulated worker under ``-X importtime``; return its measurements."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", WORKER_BOOT],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=True,
+    )
+    wall = time.perf_counter() - start
+
+    rss_kb = max_rss_kb = 0
+    for line in proc.stdout.splitlines():
+        if line.startswith("RSS_KB"):
+            _, rss, max_rss = line.split()
+            rss_kb, max_rss_kb = int(rss), int(max_rss)
+
+    # Top-level packages only: importtime indents nested imports by two spaces per level
+    packages = {}
+    for match in IMPORTTIME_LINE.finditer(proc.stderr):
+        _, cumulative, indent, name = match.groups()
+        if len(indent) == 1:
+            top = name.split(".")[0]
+            packages[top] = packages.get(top, 0) + int(cumulative)
+    return {"wall": wall, "rss_kb": rss_kb, "max_rss_kb": max_rss_kb, "packages": packages}
+
+
+class Command(BaseCommand):
+    help = "Measure worker boot cost (import time and RSS) using python -X importtime"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Number of simulated worker boots")
+        parser.add_argument("--top", type=int, default=15, help="Top-level packages to list")
+
+    def handle(self, *args, **options):
+        runs = [boot_worker() for _ in range(options["runs"])]
+
+        wall = statistics.median(r["wall"] for r in runs)
+        rss = statistics.median(r["rss_kb"] for r in runs)
+        max_rss = statistics.median(r["max_rss_kb"] for r in runs)
+        packages = {}
+        for run in runs:
+            for name, us in run["packages"].items():
+                packages.setdefault(name, []).append(us)
+        import_us = {name: statistics.median(values) for name, values in packages.items()}
+
+        self.stdout.write(f"Worker boot (median of {len(runs)}): {wall * 1000:.0f} ms wall, "
+                          f"{sum(import_us.values()) / 1000:.0f} ms importing")
+        self.stdout.write(f"RSS per worker: {rss / 1024:.1f} MiB (peak {max_rss / 1024:.1f} MiB)")
+        self.stdout.write("")
+        self.stdout.write(f"{'Package':<30} {'Import ms':>10}")
+        for name, us in sorted(import_us.items(), key=lambda item: -item[1])[:options["top"]]:
+            self.stdout.write(f"{name:<30} {us / 1000:>10.1f}")
+
+        loaded = [name for name in HEAVY_MODULES if name in import_us]
+        if loaded:
+            self.stdout.write(self.style.WARNING(f"\nHeavy modules loaded at boot: {', '.join(loaded)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"\nNo heavy modules ({', '.join(HEAVY_MODULES)}) loaded at boot."))
@@ -0,0 +1,103 @@
+import io
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from apps.attendance.importers import parse_ubys_frame, read_ubys_sheet
+
+
+def build_export(rows, sections):
+    """Build an in-memory multi-section UBYS-style .xlsx export."""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["T.C. Üniversite — Yoklama Listesi"])
+    ws.append([None, None, "IMT412\n1", "Ders Adı"])
+    ws.append([])
+
+    per_section = max(1, rows // sections)
+    student_id = 2021000000
+    for section in range(sections):
+        ws.append(["Sıra", None, None, None, "Öğrenci No", None, "Adı Soyadı"])
+        for n in range(per_section):
+            ws.append([n + 1, None, None, None, student_id, f"Öğrenci {section}-{n}"])
+            student_id += 1
+        ws.append([None, None, None, None, "Toplam", per_section])
+        ws.append([])
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def legacy_parse(df):
+    """Per-cell ``iloc`` walk used before the vectorized parser (baseline)."""
+    id_col = None
+    header_row = None
+    for i in range(min(16, len(df))):
+        for j in range(df.shape[1]):
+            val = df.iloc[i, j]
+            if pd.notna(val) and "Öğrenci No" in str(val):
+                id_col = j
+                header_row = i
+                break
+        if header_row is not None:
+            break
+
+    students = []
+    for i in range(header_row + 1, len(df)):
+        student_id = df.iloc[i, id_col]
+        name = df.iloc[i, id_col + 1]
+        if pd.isna(student_id) or pd.isna(name):
+            continue
+        student_id = (
+            str(int(student_id)) if isinstance(student_id, float) else str(student_id).strip()
+        )
+        if not student_id.isdigit():
+            continue
+        students.append((student_id, str(name).strip()))
+    return students
+
+
+class Command(BaseCommand):
+    help = "Benchmark the UBYS roster parser on a large synthetic multi-section export"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000, help="Total student rows")
+        parser.add_argument("--sections", type=int, default=20, help="Number of sections in the export")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per step")
+
+    def handle(self, *args, **options):
+        rows, sections, repeat = options["rows"], options["sections"], options["repeat"]
+        export = build_export(rows, sections)
+        self.stdout.write(f"Synthetic export: {rows} rows in {sections} sections ({len(export.getvalue())} bytes)")
+
+        def timed(fn):
+            best = float("inf")
+            result = None
+            for _ in range(repeat):
+                export.seek(0)
+                start = time.perf_counter()
+                result = fn()
+                best = min(best, time.perf_counter() - start)
+            return best, result
+
+        read_time, df = timed(lambda: read_ubys_sheet(export))
+        vector_time, roster = timed(lambda: parse_ubys_frame(df))
+        legacy_time, legacy_students = timed(lambda: legacy_parse(df))
+
+        if legacy_students != roster.students:
+            self.stderr.write(self.style.ERROR("Parsers disagree on the extracted students!"))
+
+        self.stdout.write(f"  read_excel:           {read_time * 1000:9.1f} ms")
+        self.stdout.write(f"  vectorized parse:     {vector_time * 1000:9.1f} ms ({len(roster.students)} students)")
+        self.stdout.write(f"  per-cell parse:       {legacy_time * 1000:9.1f} ms")
+        self.stdout.write(f"  single-pass total:    {(read_time + vector_time) * 1000:9.1f} ms")
+        self.stdout.write(f"  old two-read total:   {(2 * read_time + legacy_time) * 1000:9.1f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Speedup: {legacy_time / vector_time:.1f}x parse, "
+            f"{(2 * read_time + legacy_time) / (read_time + vector_time):.1f}x end to end"
+        ))
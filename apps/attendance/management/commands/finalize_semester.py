@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.reports import finalize_semester
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute each course's attendance matrix, dashboard stats and CSV/XLSX exports once and store them "
+        "as immutable snapshots served by the report views"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("semester", help='Semester name, e.g. "2024-Fall"')
+        parser.add_argument("--force", action="store_true", help="Finalize even if sessions remain today or later")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            created, existing = finalize_semester(options["semester"], force=options["force"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - start
+        if existing:
+            self.stdout.write(f"{existing} course(s) were already finalized and left unchanged.")
+        self.stdout.write(self.style.SUCCESS(f"Finalized {created} course(s) in {elapsed:.1f}s."))
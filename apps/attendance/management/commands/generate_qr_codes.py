@@ -1,10 +1,16 @@
+import json
 import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
-import qrcode
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 from apps.attendance.models import Course
+from apps.attendance.qr import QR_CONTENT_TYPES, build_print_sheet, content_key, scan_path, write_qr_file
+
+MANIFEST_NAME = "manifest.json"
 
 
 class Command(BaseCommand):
@@ -20,22 +26,105 @@ class Command(BaseCommand):
             "--course",
             help="Generate for a specific course code only",
         )
+        parser.add_argument(
+            "--format",
+            choices=sorted(QR_CONTENT_TYPES),
+            default="png",
+            help="Image format (default: png)",
+        )
+        parser.add_argument("--size", type=int, default=10, help="Pixels per QR module (default: 10)")
+        parser.add_argument("--border", type=int, default=2, help="Quiet zone in modules (default: 2)")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Renderer processes (defaults to the number of CPUs)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-render even when an up-to-date file exists",
+        )
+        parser.add_argument(
+            "--sheet",
+            choices=["pdf", "zip"],
+            help="Also bundle every selected course into one print sheet PDF or zip archive",
+        )
 
     def handle(self, *args, **options):
+        started = time.perf_counter()
         base_url = options["base_url"].rstrip("/")
+        fmt, size, border = options["format"], options["size"], options["border"]
         output_dir = os.path.join(settings.MEDIA_ROOT, "qr_codes")
         os.makedirs(output_dir, exist_ok=True)
 
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+
         courses = Course.objects.all()
         if options["course"]:
             courses = courses.filter(code=options["course"])
 
+        entries = []  # (course, url, filename)
+        jobs = []
         for course in courses:
-            url = f"{base_url}/a/{course.qr_token}/"
-            img = qrcode.make(url, box_size=10, border=2)
-            filename = f"{course.code}_{course.semester}.png"
+            url = base_url + scan_path(course)
+            filename = f"{course.code}_{course.semester}.{fmt}"
             filepath = os.path.join(output_dir, filename)
-            img.save(filepath)
-            self.stdout.write(self.style.SUCCESS(f"Generated: {filename} → {url}"))
+            key = content_key(url, size, fmt, border)
+            entries.append((course, url, filename))
+            # Content-addressed: skip files rendered from the same (url, size, format)
+            if not options["force"] and manifest.get(filename) == key and os.path.exists(filepath):
+                continue
+            jobs.append((filepath, url, key, filename))
+
+        failed = {}  # filename -> error
+        if jobs:
+            try:
+                with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+                    futures = [pool.submit(write_qr_file, path, url, size, fmt, border) for path, url, _, _ in jobs]
+                    for future, (_, url, key, filename) in zip(futures, jobs):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            failed[filename] = e
+                            manifest.pop(filename, None)
+                            self.stderr.write(self.style.ERROR(f"Failed: {filename}: {e}"))
+                            continue
+                        manifest[filename] = key
+                        self.stdout.write(self.style.SUCCESS(f"Generated: {filename} → {url}"))
+            finally:
+                # Record whatever rendered, so the next run only retries the rest
+                with open(manifest_path, "w") as f:
+                    json.dump(manifest, f, indent=2, sort_keys=True)
+        render_time = time.perf_counter() - started
+
+        entries = [entry for entry in entries if entry[2] not in failed]
+        sheet_path = None
+        if options["sheet"] and entries:
+            suffix = options["course"] or "all"
+            sheet_path = os.path.join(output_dir, f"qr_sheet_{suffix}.{options['sheet']}")
+            if options["sheet"] == "pdf":
+                build_print_sheet(
+                    [(f"{c.code} — {c.name} ({c.semester})", url) for c, url, _ in entries],
+                    sheet_path, size, border,
+                )
+            else:
+                with zipfile.ZipFile(sheet_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                    for _, _, filename in entries:
+                        archive.write(os.path.join(output_dir, filename), filename)
 
         self.stdout.write(self.style.SUCCESS(f"\nQR codes saved to: {output_dir}"))
+        if sheet_path:
+            self.stdout.write(self.style.SUCCESS(f"Print sheet: {sheet_path}"))
+        rendered = len(jobs) - len(failed)
+        self.stdout.write(
+            f"{rendered} rendered, {len(entries) - rendered} up to date "
+            f"(render {render_time:.2f}s, total {time.perf_counter() - started:.2f}s)"
+        )
+        if failed:
+            raise CommandError(f"{len(failed)} QR code(s) failed: {', '.join(sorted(failed))}")
@@ -1,9 +1,11 @@
-from datetime import date, timedelta
+import time
+from datetime import date
 
-from django.core.management.base import BaseCommand
-from django.db.models import Count
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
-from apps.attendance.models import ClassSession, Course, Schedule
+from apps.attendance.models import Course, SemesterArchive
+from apps.attendance.scheduling import delete_empty_sessions, get_holiday_dates, sync_sessions
 
 
 class Command(BaseCommand):
@@ -23,65 +25,70 @@ class Command(BaseCommand):
             "--course",
             help="Generate for a specific course code only",
         )
+        parser.add_argument(
+            "--semester",
+            help="Only courses in this semester (e.g. 2025-Spring)",
+        )
         parser.add_argument(
             "--regenerate",
             action="store_true",
-            help="Delete sessions with no attendance records before regenerating",
+            help="Delete sessions with no attendance records or excused absences before regenerating",
         )
 
     def handle(self, *args, **options):
+        started = time.perf_counter()
         courses = Course.objects.all()
         if options["course"]:
             courses = courses.filter(code=options["course"])
+        if options["semester"]:
+            courses = courses.filter(semester=options["semester"])
 
-        total_created = 0
-        total_deleted = 0
+        start_date = date.fromisoformat(options["start_date"]) if options["start_date"] else None
+        weeks = options["weeks"]
+
+        courses = list(courses)
+        if not courses:
+            raise CommandError("No matching courses.")
+        # Leave out what sync_sessions would skip, so --regenerate never
+        # deletes sessions that are not recreated.
+        archived = set(SemesterArchive.objects.values_list("semester", flat=True))
+        planned = []
         for course in courses:
-            start_date = (
-                date.fromisoformat(options["start_date"])
-                if options["start_date"]
-                else course.semester_start_date
-            )
-            if not start_date:
+            if course.semester in archived:
+                self.stderr.write(f"  {course.code}: semester {course.semester} is archived, skipping")
+            elif not (start_date or course.semester_start_date):
                 self.stderr.write(f"  {course.code}: no start date, skipping")
-                continue
-
-            weeks = options["weeks"] or course.total_weeks
+            else:
+                planned.append(course)
+        courses = planned
 
-            if options["regenerate"]:
-                # Only delete sessions with zero attendance records
-                empty_sessions = ClassSession.objects.filter(course=course).annotate(
-                    record_count=Count("records")
-                ).filter(record_count=0)
-                deleted_count = empty_sessions.count()
-                empty_sessions.delete()
-                total_deleted += deleted_count
-                self.stdout.write(f"  {course.code}: deleted {deleted_count} empty sessions")
-
-            schedules = Schedule.objects.filter(course=course)
-
-            for schedule in schedules:
-                for week in range(weeks):
-                    # Calculate the date for this day_of_week in this week
-                    days_ahead = schedule.day_of_week - start_date.weekday()
-                    if days_ahead < 0:
-                        days_ahead += 7
-                    session_date = start_date + timedelta(days=days_ahead + (week * 7))
+        # All schedules and holidays are loaded once and every course is
+        # planned and written in a single transaction.
+        holiday_dates = get_holiday_dates()
+        total_deleted = 0
+        with transaction.atomic():
+            if options["regenerate"] and courses:
+                # Only delete sessions with no records or excused absences
+                total_deleted = delete_empty_sessions(courses)
 
-                    _, created = ClassSession.objects.get_or_create(
-                        course=course,
-                        date=session_date,
-                        start_time=schedule.start_time,
-                        defaults={
-                            "end_time": schedule.end_time,
-                            "week_number": week + 1,
-                        },
-                    )
-                    if created:
-                        total_created += 1
+            results = sync_sessions(courses, holiday_dates=holiday_dates, start_date=start_date, weeks=weeks)
 
-            self.stdout.write(f"  {course.code}: processed {weeks} weeks")
+        total_created = 0
+        total_skipped = 0
+        for course in courses:
+            result = results[course.pk]
+            total_created += result.created
+            total_skipped += result.skipped
+            line = (
+                f"  {course.code} ({course.semester}): {weeks or course.total_weeks} weeks, "
+                f"created {result.created}, skipped {result.skipped} on holidays"
+            )
+            if result.cancelled:
+                line += f", cancelled {result.cancelled}"
+            self.stdout.write(line)
 
         self.stdout.write(self.style.SUCCESS(
-            f"\nDeleted {total_deleted} empty sessions, created {total_created} new sessions."
+            f"\nDeleted {total_deleted} empty sessions, created {total_created} new sessions, "
+            f"skipped {total_skipped} on holidays across {len(results)} course(s) "
+            f"in {time.perf_counter() - started:.2f}s."
         ))
@@ -1,10 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
 
-from apps.attendance.importers import (
-    detect_course_code,
-    import_students_to_course,
-    parse_ubys_student_list,
-)
+from apps.attendance.importers import import_students_to_course, parse_ubys_file
 from apps.attendance.models import Course
 
 
@@ -27,16 +23,12 @@ class Command(BaseCommand):
         filepath = options["file"]
 
         try:
-            students = parse_ubys_student_list(filepath)
+            roster = parse_ubys_file(filepath)
         except Exception as e:
             raise CommandError(f"Cannot read file: {e}")
 
-        course_code = options.get("course")
-        if not course_code:
-            try:
-                course_code = detect_course_code(filepath)
-            except Exception:
-                pass
+        students = roster.students
+        course_code = options.get("course") or roster.course_code
 
         if not course_code:
             raise CommandError("Could not detect course code. Use --course to specify it.")
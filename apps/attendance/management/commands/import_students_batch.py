@@ -0,0 +1,148 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.importers import apply_roster_diff, parse_ubys_file, plan_roster_import
+from apps.attendance.models import Course
+
+ROSTER_EXTENSIONS = (".xls", ".xlsx")
+
+
+def _parse_path(path):
+    """Process-pool worker: parse one file, returning errors instead of raising."""
+    try:
+        return path, parse_ubys_file(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _expand_paths(sources):
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(
+                os.path.join(source, name)
+                for name in sorted(os.listdir(source))
+                if name.lower().endswith(ROSTER_EXTENSIONS)
+            )
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source)))
+        else:
+            paths.append(source)
+    # Keep order, drop duplicates from overlapping arguments
+    return list(dict.fromkeys(paths))
+
+
+class Command(BaseCommand):
+    help = "Import many UBYS attendance lists at once (directory or glob), parsing files in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="+", help="Directories, globs or .xls files")
+        parser.add_argument(
+            "--semester",
+            help="Only match courses in this semester (needed when a code exists in several semesters)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Parser processes (defaults to the number of CPUs)",
+        )
+        parser.add_argument(
+            "--update-names",
+            action="store_true",
+            help="Rename existing students whose name differs from the file (kept by default)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show the full change set without saving",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        paths = _expand_paths(options["sources"])
+        if not paths:
+            raise CommandError("No .xls/.xlsx files found.")
+
+        self.stdout.write(f"Parsing {len(paths)} file(s)...")
+        # django.setup() lets spawned/forkserver workers import the app modules
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=django.setup) as pool:
+            parsed = list(pool.map(_parse_path, paths))
+        parse_time = time.perf_counter() - started
+
+        courses = Course.objects.filter(code__in={r.course_code for _, r, _ in parsed if r and r.course_code})
+        if options["semester"]:
+            courses = courses.filter(semester=options["semester"])
+        by_code = {}
+        for course in courses:
+            by_code.setdefault(course.code, []).append(course)
+
+        files = []  # (path, roster, course, status)
+        for path, roster, error in parsed:
+            course = None
+            if error:
+                status = f"read error: {error}"
+            elif not roster.course_code:
+                status = "no course code"
+            elif roster.course_code not in by_code:
+                status = f"course {roster.course_code} not found"
+            elif len(by_code[roster.course_code]) > 1:
+                status = f"{roster.course_code} is in several semesters, use --semester"
+            else:
+                course = by_code[roster.course_code][0]
+                status = "ok"
+            files.append((path, roster, course, status))
+
+        rosters = [(course, roster.students) for _, roster, course, _ in files if course]
+        diff = plan_roster_import(rosters)
+
+        self._print_summary(files, diff)
+
+        if options["dry_run"]:
+            self._print_change_set(diff, {c.pk: c for _, _, c, _ in files if c}, options["update_names"])
+            self.stdout.write(self.style.WARNING("Dry run — nothing saved."))
+            return
+
+        created_students, renamed, created_enrollments = apply_roster_diff(diff, update_names=options["update_names"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {created_students} new students, {renamed} renamed, "
+            f"{created_enrollments} new enrollments "
+            f"(parse {parse_time:.1f}s, total {time.perf_counter() - started:.1f}s)"
+        ))
+
+    def _print_summary(self, files, diff):
+        header = f"{'File':<40} {'Course':<12} {'Students':>8} {'New':>5} {'Enroll':>6}  Status"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for path, roster, course, status in files:
+            name = os.path.basename(path)[:40]
+            if course is None:
+                code = (roster.course_code or "-") if roster else "-"
+                self.stdout.write(self.style.ERROR(f"{name:<40} {code:<12} {'':>8} {'':>5} {'':>6}  {status}"))
+                continue
+            ids = {sid for sid, _ in roster.students}
+            new = len(ids & diff.new_students.keys())
+            enroll = len(ids.intersection(diff.new_enrollments.get(course.pk, ())))
+            self.stdout.write(f"{name:<40} {course.code:<12} {len(ids):>8} {new:>5} {enroll:>6}  {status}")
+        self.stdout.write("")
+
+    def _print_change_set(self, diff, courses, update_names):
+        self.stdout.write(f"New students ({len(diff.new_students)}):")
+        for sid, name in diff.new_students.items():
+            self.stdout.write(f"  + {sid} — {name}")
+        action = "renamed" if update_names else "kept, pass --update-names to rename"
+        self.stdout.write(f"Name differs from the file ({len(diff.renamed_students)}, {action}):")
+        for sid, (old, new) in diff.renamed_students.items():
+            self.stdout.write(f"  ~ {sid}: {old} → {new}")
+        for course_id, ids in diff.new_enrollments.items():
+            missing = diff.missing_enrollments.get(course_id, [])
+            self.stdout.write(f"{courses[course_id].code}: {len(ids)} new enrollment(s), {len(missing)} not in list")
+            for sid in ids:
+                self.stdout.write(f"  + {sid}")
+            for sid in missing:
+                self.stdout.write(f"  ? {sid} (enrolled, missing from the new list)")
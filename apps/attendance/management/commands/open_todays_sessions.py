@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.attendance.scheduling import open_sessions_for_date
+
+
+class Command(BaseCommand):
+    help = "Create today's ClassSessions ahead of time so QR scans only read (run from cron or at deploy)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Open sessions for this date (YYYY-MM-DD) instead of today",
+        )
+
+    def handle(self, *args, **options):
+        day = date.fromisoformat(options["date"]) if options["date"] else timezone.localdate()
+        created, already_open = open_sessions_for_date(day)
+        self.stdout.write(self.style.SUCCESS(
+            f"{day}: opened {created} session(s), {already_open} already open."
+        ))
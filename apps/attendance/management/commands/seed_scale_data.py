@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.models import Course, Student
+from apps.attendance.seeding import BULK_BATCH_SIZE, clear_seeded_data, seed_scale_data
+
+
+class Command(BaseCommand):
+    help = "Generate a large, deterministic synthetic dataset (students, sessions, attendance) for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--semesters", type=int, default=1)
+        parser.add_argument("--courses", type=int, default=10, help="Courses per semester")
+        parser.add_argument("--students-per-course", type=int, default=60)
+        parser.add_argument(
+            "--student-pool",
+            type=int,
+            default=None,
+            help="Distinct students to enroll from (default: about five courses per student)",
+        )
+        parser.add_argument("--weeks", type=int, default=14)
+        parser.add_argument("--sessions-per-week", type=int, default=2)
+        parser.add_argument("--attendance-rate", type=float, default=0.8)
+        parser.add_argument("--excused-rate", type=float, default=0.02)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--prefix", default="SCALE", help="Prefix for generated course codes and student IDs")
+        parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete data previously generated with the same prefix first",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if options["clear"]:
+            deleted = clear_seeded_data(prefix)
+            self.stdout.write(f"Cleared {deleted} course(s) with prefix {prefix}.")
+        elif (
+            Course.objects.filter(code__startswith=prefix).exists()
+            or Student.objects.filter(student_id__startswith=prefix).exists()
+        ):
+            raise CommandError(f"Data with prefix {prefix} already exists; pass --clear to regenerate it.")
+
+        start = time.perf_counter()
+
+        def progress(semester, result):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"  {semester}: {len(result.courses)} courses, {result.records} records so far "
+                f"({result.records / elapsed:,.0f} records/sec)"
+            )
+
+        result = seed_scale_data(
+            random.Random(options["seed"]),
+            semesters=options["semesters"],
+            courses=options["courses"],
+            students_per_course=options["students_per_course"],
+            student_pool=options["student_pool"],
+            weeks=options["weeks"],
+            sessions_per_week=options["sessions_per_week"],
+            attendance_rate=options["attendance_rate"],
+            excused_rate=options["excused_rate"],
+            prefix=prefix,
+            batch_size=options["batch_size"],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(result.courses)} courses, {len(result.students)} students, "
+            f"{result.enrollments} enrollments, {result.sessions} sessions, "
+            f"{result.records} attendance records and {result.excused} excused absences "
+            f"in {elapsed:.1f}s (seed {options['seed']})."
+        ))
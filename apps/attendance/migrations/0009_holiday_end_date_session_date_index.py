@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-19 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_add_student_email_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='holiday',
+            name='end_date',
+            field=models.DateField(blank=True, help_text='Last day of a multi-day break (e.g. bayram week); leave empty for a single day', null=True),
+        ),
+        migrations.AlterField(
+            model_name='holiday',
+            name='date',
+            field=models.DateField(help_text='First (or only) day of the holiday', unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['date'], name='attendance__date_6c7492_idx'),
+        ),
+    ]
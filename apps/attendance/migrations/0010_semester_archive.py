@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-19 08:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_holiday_end_date_session_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SemesterArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('semester', models.CharField(max_length=20, unique=True)),
+                ('path', models.CharField(help_text='Directory holding the archive files', max_length=500)),
+                ('file_format', models.CharField(choices=[('csv.gz', 'CSV (gzip)'), ('parquet', 'Parquet')], default='csv.gz', max_length=10)),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('records', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('purged_at', models.DateTimeField(blank=True, help_text='When the archived rows were deleted from the live tables', null=True)),
+            ],
+            options={
+                'ordering': ['-semester'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attended', models.PositiveIntegerField(default=0)),
+                ('total_sessions', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summary', to='attendance.enrollment')),
+            ],
+            options={
+                'verbose_name_plural': 'attendance summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-19 08:56
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_semester_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('csv', models.BinaryField()),
+                ('xlsx', models.BinaryField()),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='report_snapshot', to='attendance.course')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
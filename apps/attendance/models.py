@@ -1,5 +1,7 @@
 import uuid
+from datetime import timedelta
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils.text import slugify
 
@@ -7,15 +9,35 @@ from apps.core.models import TimeStampedModel
 
 
 class Holiday(TimeStampedModel):
-    date = models.DateField(unique=True)
+    date = models.DateField(unique=True, help_text="First (or only) day of the holiday")
+    end_date = models.DateField(
+        null=True, blank=True,
+        help_text="Last day of a multi-day break (e.g. bayram week); leave empty for a single day",
+    )
     name = models.CharField(max_length=200)
 
     class Meta:
         ordering = ["date"]
 
     def __str__(self):
+        if self.end_date and self.end_date != self.date:
+            return f"{self.date} – {self.end_date} — {self.name}"
         return f"{self.date} — {self.name}"
 
+    @property
+    def last_date(self):
+        return self.end_date or self.date
+
+    def dates(self):
+        """Every date covered by this holiday."""
+        return [self.date + timedelta(days=n) for n in range((self.last_date - self.date).days + 1)]
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        if self.end_date and self.end_date < self.date:
+            raise ValidationError({"end_date": "End date cannot be before the start date."})
+
 
 class Student(TimeStampedModel):
     student_id = models.CharField(max_length=20, unique=True)
@@ -114,6 +136,7 @@ class ClassSession(TimeStampedModel):
         indexes = [
             models.Index(fields=["course", "is_cancelled"]),
             models.Index(fields=["course", "date"]),
+            models.Index(fields=["date"]),
         ]
 
     def __str__(self):
@@ -180,3 +203,58 @@ class CourseMaterial(TimeStampedModel):
 
         if not self.file and not self.url:
             raise ValidationError("At least one of 'file' or 'url' must be provided.")
+
+
+class SemesterArchive(TimeStampedModel):
+    """A closed semester whose sessions, records and excuses live in archive files."""
+
+    FORMAT_CSV_GZ = "csv.gz"
+    FORMAT_PARQUET = "parquet"
+    FORMAT_CHOICES = [(FORMAT_CSV_GZ, "CSV (gzip)"), (FORMAT_PARQUET, "Parquet")]
+
+    semester = models.CharField(max_length=20, unique=True)
+    path = models.CharField(max_length=500, help_text="Directory holding the archive files")
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=FORMAT_CSV_GZ)
+    sessions = models.PositiveIntegerField(default=0)
+    records = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    purged_at = models.DateTimeField(
+        null=True, blank=True, help_text="When the archived rows were deleted from the live tables"
+    )
+
+    class Meta:
+        ordering = ["-semester"]
+
+    def __str__(self):
+        return f"{self.semester} ({self.records} records)"
+
+
+class AttendanceSummary(TimeStampedModel):
+    """Per-enrollment attendance totals frozen when a semester is archived."""
+
+    enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name="attendance_summary")
+    attended = models.PositiveIntegerField(default=0)
+    total_sessions = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "attendance summaries"
+
+    def __str__(self):
+        return f"{self.enrollment}: {self.attended}/{self.total_sessions}"
+
+
+class CourseReportSnapshot(TimeStampedModel):
+    """A finalized course's matrix, dashboard stats and exports, computed once.
+
+    ``data`` holds the matrix and dashboard as JSON; ``csv`` and ``xlsx`` are
+    the ready-made export files. Snapshots are never updated in place.
+    """
+
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, related_name="report_snapshot")
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    csv = models.BinaryField()
+    xlsx = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.course} report ({self.created_at:%Y-%m-%d})"
@@ -0,0 +1,88 @@
+"""Server-side QR code rendering for course scan URLs."""
+
+import hashlib
+import io
+from functools import lru_cache
+
+from django.urls import reverse
+
+QR_CONTENT_TYPES = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+DEFAULT_BOX_SIZE = 10
+MAX_BOX_SIZE = 40
+QR_BORDER = 4  # modules of quiet zone, as the QR spec recommends
+
+
+def scan_path(course):
+    """The course's scan page path, as routed by the URLconf."""
+    return reverse("attendance:scan_landing", args=[course.qr_token])
+
+
+@lru_cache(maxsize=256)
+def render_qr(url, box_size=DEFAULT_BOX_SIZE, fmt="png", border=QR_BORDER):
+    """Render ``url`` as a QR image and return ``(content, etag)``.
+
+    Results are memoized per process; the scan URL embeds the course's
+    immutable ``qr_token``, so ``(url, box_size, fmt)`` fully determines
+    the image.
+    """
+    # qrcode pulls in PIL; keep it off the worker boot path
+    import qrcode
+
+    if fmt not in QR_CONTENT_TYPES:
+        raise ValueError(f"Unsupported QR format: {fmt}")
+
+    kwargs = {"box_size": box_size, "border": border}
+    if fmt == "svg":
+        import qrcode.image.svg
+
+        kwargs["image_factory"] = qrcode.image.svg.SvgPathImage
+
+    buf = io.BytesIO()
+    qrcode.make(url, **kwargs).save(buf)
+    content = buf.getvalue()
+    return content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def content_key(url, box_size, fmt, border):
+    """Stable hash of everything that determines a rendered QR file."""
+    return hashlib.sha256(f"{url}|{box_size}|{fmt}|{border}".encode()).hexdigest()
+
+
+def write_qr_file(path, url, box_size=DEFAULT_BOX_SIZE, fmt="png", border=QR_BORDER):
+    """Render a QR code to ``path``; module-level so process pools can pickle it."""
+    content, _ = render_qr(url, box_size, fmt, border)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def build_print_sheet(entries, path, box_size=DEFAULT_BOX_SIZE, border=QR_BORDER):
+    """Write a printable PDF with one labelled QR code per A4 page.
+
+    Args:
+        entries: Iterable of (label, url) pairs.
+        path: Output .pdf path.
+    """
+    from PIL import Image, ImageDraw
+
+    page_size = (1240, 1754)  # A4 at 150 dpi
+    pages = []
+    for label, url in entries:
+        content, _ = render_qr(url, box_size, "png", border)
+        code = Image.open(io.BytesIO(content)).convert("RGB")
+        side = min(page_size[0] - 200, code.width * 2)
+        code = code.resize((side, side), Image.NEAREST)
+
+        page = Image.new("RGB", page_size, "white")
+        page.paste(code, ((page_size[0] - side) // 2, 250))
+        draw = ImageDraw.Draw(page)
+        draw.text((100, 120), label, fill="black", font_size=48)
+        draw.text((100, 300 + side), url, fill="gray", font_size=24)
+        pages.append(page)
+
+    if pages:
+        pages[0].save(path, "PDF", resolution=150, save_all=True, append_images=pages[1:])
+    return len(pages)
@@ -0,0 +1,324 @@
+"""Course attendance data for the matrix, dashboards and exports.
+
+Live semesters are read from the database; archived ones from their
+archive files (see ``archive.py``), so every report works the same way
+after a semester has been purged from the live tables. Finalized
+semesters skip both: their reports are computed once and stored as a
+``CourseReportSnapshot``.
+"""
+
+import csv
+import datetime
+import io
+from dataclasses import dataclass, field
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import (
+    AttendanceRecord,
+    ClassSession,
+    Course,
+    CourseReportSnapshot,
+    Enrollment,
+    ExcusedAbsence,
+    SemesterArchive,
+)
+from .scheduling import held_sessions
+
+AT_RISK_PERCENTAGE = 60
+EXPORT_FORMATS = ("csv", "xlsx")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@dataclass
+class CourseAttendance:
+    sessions: list = field(default_factory=list)  # held sessions, by date and start time
+    attended: set = field(default_factory=set)  # (student pk, session pk)
+    entered: set = field(default_factory=set)  # (student number as entered, session pk)
+    excused: set = field(default_factory=set)  # (student pk, session pk)
+
+
+def load_course_attendance(course, student=None, now=None):
+    """Sessions, attendance and excuses of a course's held sessions.
+
+    Held means not cancelled and already started (``scheduling.held_sessions``),
+    the same cutoff the portal dashboard and digests use.
+
+    Args:
+        course: The Course.
+        student: Optional Student to restrict attendance and excuses to.
+        now: Cutoff for held sessions; defaults to the current time.
+    """
+    archive = SemesterArchive.objects.filter(semester=course.semester).first()
+    if archive is not None:
+        return _load_archived(course, archive, student)
+
+    now = now or timezone.now()
+    sessions = list(ClassSession.objects.filter(held_sessions(now=now), course=course).order_by("date", "start_time"))
+    records = AttendanceRecord.objects.filter(held_sessions("session__", now), session__course=course)
+    excuses = ExcusedAbsence.objects.filter(held_sessions("session__", now), session__course=course)
+    if student is not None:
+        records = records.filter(student=student)
+        excuses = excuses.filter(student=student)
+
+    data = CourseAttendance(sessions=sessions)
+    for student_id, entered, session_id in records.values_list("student_id", "student_id_entered", "session_id"):
+        data.entered.add((entered, session_id))
+        if student_id is not None:
+            data.attended.add((student_id, session_id))
+    data.excused = set(excuses.values_list("student_id", "session_id"))
+    return data
+
+
+def _load_archived(course, archive, student=None):
+    from .archive import read_course_archive
+
+    tables = read_course_archive(archive, course.pk)
+    sessions = sorted(
+        (
+            ClassSession(
+                pk=row["id"],
+                course=course,
+                date=row["date"],
+                week_number=row["week_number"],
+                start_time=row["start_time"],
+                end_time=row["end_time"],
+                is_cancelled=row["is_cancelled"],
+            )
+            for row in tables["sessions"]
+            if not row["is_cancelled"]
+        ),
+        key=lambda s: (s.date, s.start_time),
+    )
+    held = {s.pk for s in sessions}
+
+    def wanted(row):
+        return row["session_id"] in held and (student is None or row["student_id"] == student.pk)
+
+    data = CourseAttendance(sessions=sessions)
+    for row in filter(wanted, tables["records"]):
+        data.entered.add((row["student_id_entered"], row["session_id"]))
+        if row["student_id"] is not None:
+            data.attended.add((row["student_id"], row["session_id"]))
+    data.excused = {(row["student_id"], row["session_id"]) for row in filter(wanted, tables["excuses"])}
+    return data
+
+
+def course_matrix(course, data=None):
+    """Attendance matrix rows ("P", "E" or "A" per held session) by student number.
+
+    Returns:
+        tuple[list, list]: (sessions, rows)
+    """
+    data = data or load_course_attendance(course)
+    enrollments = Enrollment.objects.filter(course=course).select_related("student").order_by("student__student_id")
+
+    rows = []
+    for enrollment in enrollments:
+        student = enrollment.student
+        attendance = []
+        for session in data.sessions:
+            if (student.pk, session.pk) in data.excused:
+                attendance.append("E")
+            elif (student.student_id, session.pk) in data.entered:
+                attendance.append("P")
+            else:
+                attendance.append("A")
+        rows.append({
+            "student": student,
+            "attendance": attendance,
+            "total": sum(1 for a in attendance if a == "P"),
+        })
+    return data.sessions, rows
+
+
+def course_dashboard(course, data=None):
+    """Summary numbers and at-risk students (lowest first) for the course dashboard."""
+    data = data or load_course_attendance(course)
+    sessions = data.sessions
+    total_sessions = len(sessions)
+    enrollments = Enrollment.objects.filter(course=course).select_related("student")
+    total_students = len(enrollments)
+
+    student_stats = []
+    total_pct_sum = 0
+    for enrollment in enrollments:
+        student = enrollment.student
+        attended = sum(1 for s in sessions if (student.pk, s.pk) in data.attended)
+        excused = sum(1 for s in sessions if (student.pk, s.pk) in data.excused)
+        effective = total_sessions - excused
+        pct = round(attended / effective * 100) if effective > 0 else 0
+        total_pct_sum += pct
+        student_stats.append({
+            "student": student,
+            "attended": attended,
+            "excused": excused,
+            "effective_total": effective,
+            "percentage": pct,
+        })
+
+    return {
+        "total_students": total_students,
+        "total_sessions": total_sessions,
+        "avg_attendance": round(total_pct_sum / total_students) if total_students > 0 else 0,
+        "at_risk": sorted(
+            [s for s in student_stats if s["percentage"] < AT_RISK_PERCENTAGE],
+            key=lambda x: x["percentage"],
+        ),
+    }
+
+
+def _matrix_table(sessions, rows):
+    yield ["Student ID", "Name"] + [f"W{s.week_number} ({s.date})" for s in sessions] + ["Total"]
+    for row in rows:
+        yield [row["student"].student_id, row["student"].name] + row["attendance"] + [row["total"]]
+
+
+def matrix_csv(sessions, rows):
+    """The attendance matrix as CSV bytes."""
+    out = io.StringIO()
+    csv.writer(out).writerows(_matrix_table(sessions, rows))
+    return out.getvalue().encode()
+
+
+def matrix_xlsx(sessions, rows, title="Attendance"):
+    """The attendance matrix as an .xlsx workbook."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    for line in _matrix_table(sessions, rows):
+        sheet.append(line)
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+def _student_json(student):
+    return {"student_id": student.student_id, "name": student.name}
+
+
+def build_snapshot(course):
+    """Compute a course's matrix, dashboard and exports as an unsaved snapshot."""
+    data = load_course_attendance(course)
+    sessions, rows = course_matrix(course, data)
+    dashboard = course_dashboard(course, data)
+    return CourseReportSnapshot(
+        course=course,
+        data={
+            "sessions": [{"week_number": s.week_number, "date": s.date} for s in sessions],
+            "rows": [{**row, "student": _student_json(row["student"])} for row in rows],
+            "dashboard": {
+                **dashboard,
+                "at_risk": [{**s, "student": _student_json(s["student"])} for s in dashboard["at_risk"]],
+            },
+        },
+        csv=matrix_csv(sessions, rows),
+        xlsx=matrix_xlsx(sessions, rows, title=course.code),
+    )
+
+
+def snapshot_matrix(snapshot):
+    """(sessions, rows) from a snapshot, shaped like ``course_matrix``'s result."""
+    sessions = [
+        ClassSession(week_number=s["week_number"], date=datetime.date.fromisoformat(s["date"]))
+        for s in snapshot.data["sessions"]
+    ]
+    return sessions, snapshot.data["rows"]
+
+
+def finalize_semester(semester, force=False):
+    """Store a report snapshot for every course of ``semester`` that lacks one.
+
+    Existing snapshots are left untouched, so re-running only fills in
+    courses added since.
+
+    Raises:
+        ValueError: Unknown semester, or sessions still ahead (without ``force``).
+
+    Returns:
+        tuple[int, int]: (created, already_finalized)
+    """
+    courses = list(Course.objects.filter(semester=semester).order_by("code"))
+    if not courses:
+        raise ValueError(f"No courses in semester {semester}.")
+    last_session = ClassSession.objects.filter(course__semester=semester).aggregate(last=Max("date"))["last"]
+    if last_session and last_session >= timezone.localdate() and not force:
+        raise ValueError(f"Semester {semester} still has sessions on or after today ({last_session}).")
+
+    done = set(CourseReportSnapshot.objects.filter(course__in=courses).values_list("course_id", flat=True))
+    created = 0
+    for course in courses:
+        if course.pk in done:
+            continue
+        build_snapshot(course).save()
+        created += 1
+    return created, len(done)
+
+
+def finalized_snapshot(course):
+    """The course's report snapshot without its export blobs, or None if not finalized."""
+    return CourseReportSnapshot.objects.filter(course=course).defer("csv", "xlsx").first()
+
+
+def matrix_export(course, file_format):
+    """The attendance matrix export, from the snapshot when the course is finalized.
+
+    Returns:
+        tuple[bytes, str, str]: (content, content type, filename)
+    """
+    content_type = XLSX_CONTENT_TYPE if file_format == "xlsx" else "text/csv"
+    filename = f"{course.code}_attendance.{file_format}"
+    content = CourseReportSnapshot.objects.filter(course=course).values_list(file_format, flat=True).first()
+    if content is not None:
+        return bytes(content), content_type, filename
+
+    sessions, rows = course_matrix(course)
+    if file_format == "xlsx":
+        return matrix_xlsx(sessions, rows, title=course.code), content_type, filename
+    return matrix_csv(sessions, rows), content_type, filename
+
+
+def attendance_summary_csv(course, progress=None):
+    """Per-student attendance with totals and percentage, as exported from the course admin.
+
+    Args:
+        course: The Course.
+        progress: Optional ``callback(done, total)`` called every 100 students.
+    """
+    data = load_course_attendance(course)
+    sessions = data.sessions
+    enrollments = list(Enrollment.objects.filter(course=course).select_related("student"))
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    # Header: Student ID, Name, date columns..., Total, %
+    header = ["Student ID", "Name"]
+    for s in sessions:
+        header.append(f"W{s.week_number} {s.date.strftime('%m/%d')}")
+    header += ["Attended", "Total", "Excused", "%"]
+    writer.writerow(header)
+
+    total_sessions = len(sessions)
+    for n, enrollment in enumerate(enrollments, 1):
+        student = enrollment.student
+        row = [student.student_id, student.name]
+        student_attended = 0
+        student_excused = 0
+        for s in sessions:
+            if (student.pk, s.pk) in data.excused:
+                row.append("E")
+                student_excused += 1
+            elif (student.pk, s.pk) in data.attended:
+                row.append("P")
+                student_attended += 1
+            else:
+                row.append("A")
+        effective_total = total_sessions - student_excused
+        pct = round(student_attended / effective_total * 100) if effective_total > 0 else 0
+        row += [student_attended, total_sessions, student_excused, f"{pct}%"]
+        writer.writerow(row)
+        if progress and n % 100 == 0:
+            progress(n, len(enrollments))
+    return out.getvalue().encode()
@@ -0,0 +1,404 @@
+"""Semester session planning shared by the admin and management commands."""
+
+import datetime
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import AttendanceRecord, ClassSession, Course, ExcusedAbsence, Holiday, Schedule, SemesterArchive
+
+BULK_BATCH_SIZE = 500
+
+
+@dataclass
+class SessionSyncResult:
+    created: int = 0
+    cancelled: int = 0
+    skipped: int = 0  # planned slots that fall on a holiday
+
+
+@dataclass
+class ScheduleResyncResult:
+    moved: int = 0
+    kept: int = 0  # future sessions left in place because they already have records
+    removed: int = 0  # empty sessions dropped because the new slot is taken or already past
+    cancelled: int = 0  # moved sessions that now fall on a holiday
+
+    def __str__(self):
+        text = f"moved {self.moved}, kept {self.kept} with records, removed {self.removed} duplicate or past"
+        if self.cancelled:
+            text += f", cancelled {self.cancelled} on holidays"
+        return text
+
+
+SCHEDULE_SLOT_FIELDS = ("day_of_week", "start_time", "end_time")
+
+
+SESSIONS_VERSION_KEY = "attendance:sessions-version"
+
+
+def get_holiday_dates():
+    """All holiday dates (ranges expanded) as a set, fetched in one query."""
+    dates = set()
+    for start, end in Holiday.objects.values_list("date", "end_date"):
+        dates.update(Holiday(date=start, end_date=end).dates())
+    return dates
+
+
+def held_sessions(prefix="", now=None):
+    """Q for sessions that count toward attendance: not cancelled and already started.
+
+    Sessions are generated for the whole semester up front; the ones still
+    ahead (including today's later slots) are not absences yet.
+
+    Args:
+        prefix: Lookup path to the session, e.g. ``"session__"``.
+        now: Cutoff; defaults to the current time.
+    """
+    now = timezone.localtime(now)
+    return Q(**{f"{prefix}is_cancelled": False}) & (
+        Q(**{f"{prefix}date__lt": now.date()})
+        | Q(**{f"{prefix}date": now.date(), f"{prefix}start_time__lte": now.time()})
+    )
+
+
+def get_sessions_version():
+    """Counter bumped whenever sessions are cancelled/restored in bulk.
+
+    Anything that caches session state or per-course aggregates should
+    include this in its cache key (or compare it) to notice invalidation.
+    """
+    return cache.get_or_set(SESSIONS_VERSION_KEY, 1, timeout=None)
+
+
+def bump_sessions_version():
+    try:
+        cache.incr(SESSIONS_VERSION_KEY)
+    except ValueError:
+        cache.add(SESSIONS_VERSION_KEY, 2, timeout=None)
+
+
+def cancel_holiday_sessions(start, end):
+    """Cancel every session in ``[start, end]`` with one range UPDATE.
+
+    Must be called inside a transaction; cached aggregates are invalidated
+    when it commits.
+
+    Returns:
+        int: Number of sessions cancelled.
+    """
+    cancelled = ClassSession.objects.filter(date__range=(start, end), is_cancelled=False).update(
+        is_cancelled=True
+    )
+    if cancelled:
+        transaction.on_commit(bump_sessions_version)
+    return cancelled
+
+
+def restore_holiday_sessions(start, end):
+    """Un-cancel sessions in ``[start, end]`` that no saved holiday still covers.
+
+    Call it after the holiday has been deleted or moved.
+
+    Returns:
+        int: Number of sessions restored.
+    """
+    covering = Holiday.objects.filter(date__lte=end).filter(
+        Q(end_date__gte=start) | Q(end_date__isnull=True, date__gte=start)
+    )
+    still_covered = {d for holiday in covering for d in holiday.dates()}
+
+    restored = (
+        ClassSession.objects.filter(date__range=(start, end), is_cancelled=True)
+        .exclude(date__in=still_covered)
+        .update(is_cancelled=False)
+    )
+    if restored:
+        transaction.on_commit(bump_sessions_version)
+    return restored
+
+
+def plan_course_sessions(course, schedules, holiday_dates, start_date=None, weeks=None):
+    """Compute the target sessions for a course in memory.
+
+    Args:
+        course: A Course instance.
+        schedules: Iterable of the course's Schedule rows.
+        holiday_dates: Set of dates on which no session is planned.
+        start_date: Defaults to ``course.semester_start_date``.
+        weeks: Defaults to ``course.total_weeks``.
+
+    Returns:
+        tuple[dict, int]: ``{(date, start_time): (end_time, week_number)}``
+        and the number of slots skipped because they fall on a holiday.
+    """
+    start_date = start_date or course.semester_start_date
+    weeks = weeks or course.total_weeks
+    target = {}
+    skipped = 0
+    for schedule in schedules:
+        # Days from the semester start to this schedule's weekday, same for every week
+        days_ahead = (schedule.day_of_week - start_date.weekday()) % 7
+        for week in range(weeks):
+            session_date = start_date + datetime.timedelta(days=days_ahead, weeks=week)
+            if session_date in holiday_dates:
+                skipped += 1
+                continue
+            target[(session_date, schedule.start_time)] = (schedule.end_time, week + 1)
+    return target, skipped
+
+
+def empty_sessions(courses):
+    """Sessions of the given courses with no attendance records and no excused absences."""
+    return ClassSession.objects.filter(course__in=courses).filter(
+        ~Exists(AttendanceRecord.objects.filter(session=OuterRef("pk"))),
+        ~Exists(ExcusedAbsence.objects.filter(session=OuterRef("pk"))),
+    )
+
+
+def delete_empty_sessions(courses):
+    """Delete empty sessions with a single ``DELETE ... WHERE NOT EXISTS``.
+
+    Empty sessions have no dependent rows, so Django's cascade collector
+    (which loads every object before deleting) can be bypassed safely.
+
+    Returns:
+        int: Number of deleted sessions.
+    """
+    qs = empty_sessions(courses)
+    deleted = qs._raw_delete(qs.db)
+    if deleted:
+        transaction.on_commit(bump_sessions_version)
+    return deleted
+
+
+def sync_course_sessions(course, schedules=None, holiday_dates=None, start_date=None, weeks=None):
+    """Create missing sessions for a course and cancel ones that fall on holidays.
+
+    Pass ``schedules``/``holiday_dates`` when they are already loaded to skip
+    those queries.
+
+    Returns:
+        SessionSyncResult
+    """
+    return sync_sessions(
+        [course],
+        schedules=None if schedules is None else {course.pk: schedules},
+        holiday_dates=holiday_dates,
+        start_date=start_date,
+        weeks=weeks,
+    ).get(course.pk, SessionSyncResult())
+
+
+def sync_sessions(courses, schedules=None, holiday_dates=None, start_date=None, weeks=None):
+    """Plan and write sessions for many courses in one batch.
+
+    Schedules, holidays and existing sessions are each loaded with a single
+    query for all courses. New sessions are written with chunked
+    ``bulk_create`` and holiday sessions are cancelled with one ``update``,
+    all inside one transaction. Courses without a start date (and no
+    ``start_date`` override) and courses of archived semesters are left out.
+
+    Args:
+        courses: Iterable of Course instances.
+        schedules: Optional ``{course_id: [Schedule, ...]}`` already loaded.
+        holiday_dates: Optional set of holiday dates already loaded.
+        start_date: Overrides each course's ``semester_start_date``.
+        weeks: Overrides each course's ``total_weeks``.
+
+    Returns:
+        dict: ``{course_id: SessionSyncResult}`` for every planned course.
+    """
+    archived = set(SemesterArchive.objects.values_list("semester", flat=True))
+    courses = [c for c in courses if (start_date or c.semester_start_date) and c.semester not in archived]
+    course_ids = [c.pk for c in courses]
+    if schedules is None:
+        schedules = {}
+        for schedule in Schedule.objects.filter(course_id__in=course_ids):
+            schedules.setdefault(schedule.course_id, []).append(schedule)
+    if holiday_dates is None:
+        holiday_dates = get_holiday_dates()
+
+    existing = {}
+    for course_id, pk, date, start_time, is_cancelled in ClassSession.objects.filter(
+        course_id__in=course_ids
+    ).values_list("course_id", "pk", "date", "start_time", "is_cancelled"):
+        existing[(course_id, date, start_time)] = (pk, is_cancelled)
+
+    results = {}
+    to_create = []
+    to_cancel = []
+    for course in courses:
+        target, skipped = plan_course_sessions(
+            course, schedules.get(course.pk, []), holiday_dates, start_date, weeks
+        )
+        result = results[course.pk] = SessionSyncResult(skipped=skipped)
+        for (date, start_time), (end_time, week_number) in target.items():
+            if (course.pk, date, start_time) not in existing:
+                to_create.append(ClassSession(
+                    course=course,
+                    date=date,
+                    start_time=start_time,
+                    end_time=end_time,
+                    week_number=week_number,
+                ))
+                result.created += 1
+
+    for (course_id, date, _), (pk, is_cancelled) in existing.items():
+        if date in holiday_dates and not is_cancelled:
+            to_cancel.append(pk)
+            results[course_id].cancelled += 1
+
+    with transaction.atomic():
+        if to_create:
+            ClassSession.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        if to_cancel:
+            ClassSession.objects.filter(pk__in=to_cancel).update(is_cancelled=True)
+            transaction.on_commit(bump_sessions_version)
+
+    return results
+
+
+def resync_schedule_sessions(schedule, previous):
+    """Move future sessions of one edited schedule slot to its new day/time.
+
+    Only sessions derived from the old slot (same course, weekday and start
+    time, dated today or later) are touched. Sessions that already have
+    attendance records or excused absences stay where they are; empty ones
+    are moved with one ``bulk_update``, or deleted if the course already has
+    a session in the new slot or the new date is already past. Moved
+    sessions are cancelled when they land on a holiday, and un-cancelled
+    when they leave one.
+
+    Args:
+        schedule: The saved Schedule with its new values.
+        previous: Object or dict with the old ``day_of_week``, ``start_time``
+            and ``end_time``.
+
+    Returns:
+        ScheduleResyncResult
+    """
+    if isinstance(previous, dict):
+        old_day, old_start = previous["day_of_week"], previous["start_time"]
+    else:
+        old_day, old_start = previous.day_of_week, previous.start_time
+
+    result = ScheduleResyncResult()
+    today = timezone.localdate()
+    future = ClassSession.objects.filter(course_id=schedule.course_id, date__gte=today)
+
+    candidates = list(
+        future.filter(start_time=old_start, date__iso_week_day=old_day + 1).annotate(
+            has_records=Exists(AttendanceRecord.objects.filter(session=OuterRef("pk")))
+            | Exists(ExcusedAbsence.objects.filter(session=OuterRef("pk"))),
+        )
+    )
+    if not candidates:
+        return result
+
+    occupied = set(future.values_list("date", "start_time"))
+    shift = datetime.timedelta(days=schedule.day_of_week - old_day)
+    start_date = schedule.course.semester_start_date
+    holiday_dates = get_holiday_dates()
+    now = timezone.now()
+
+    to_move = []
+    to_delete = []
+    for session in candidates:
+        if session.has_records:
+            result.kept += 1
+            continue
+        new_date = session.date + shift
+        if new_date < today or (
+            (new_date, schedule.start_time) in occupied
+            and (new_date, schedule.start_time) != (session.date, session.start_time)
+        ):
+            to_delete.append(session.pk)
+            continue
+        if new_date in holiday_dates:
+            result.cancelled += not session.is_cancelled
+            session.is_cancelled = True
+        elif session.date in holiday_dates:
+            session.is_cancelled = False
+        session.date = new_date
+        session.start_time = schedule.start_time
+        session.end_time = schedule.end_time
+        if start_date:
+            session.week_number = (new_date - start_date).days // 7 + 1
+        session.updated_at = now  # bulk_update skips auto_now
+        to_move.append(session)
+
+    with transaction.atomic():
+        if to_move:
+            result.moved = ClassSession.objects.bulk_update(
+                to_move, ["date", "start_time", "end_time", "week_number", "is_cancelled", "updated_at"]
+            )
+        if to_delete:
+            dropped = ClassSession.objects.filter(pk__in=to_delete)
+            result.removed = dropped._raw_delete(dropped.db)
+        if result.moved or result.removed:
+            transaction.on_commit(bump_sessions_version)
+    return result
+
+
+def active_courses(day):
+    """Courses of non-archived semesters whose planned weeks include ``day``."""
+    courses = Course.objects.filter(semester_start_date__lte=day).exclude(
+        semester__in=SemesterArchive.objects.values("semester")
+    )
+    return [
+        course
+        for course in courses
+        if day < course.semester_start_date + datetime.timedelta(weeks=course.total_weeks)
+    ]
+
+
+def open_sessions_for_date(day):
+    """Materialize every course's sessions for ``day`` ahead of the scan rush.
+
+    Slots come from ``plan_course_sessions``, so the result matches what
+    ``sync_sessions`` would create: courses without a start date, outside
+    their ``total_weeks`` window or of an archived semester get nothing,
+    and neither does any course on a holiday (the scan path treats that
+    as "not active"). Uses one query each for holidays, schedules and
+    existing sessions, then a single ``bulk_create``.
+
+    Returns:
+        tuple[int, int]: (created, already_open)
+    """
+    holiday_dates = get_holiday_dates()
+    if day in holiday_dates:
+        return 0, 0
+
+    by_course = {}
+    for schedule in (
+        Schedule.objects.filter(day_of_week=day.weekday(), course__semester_start_date__lte=day)
+        .exclude(course__semester__in=SemesterArchive.objects.values("semester"))
+        .select_related("course")
+    ):
+        by_course.setdefault(schedule.course, []).append(schedule)
+
+    existing = set(
+        ClassSession.objects.filter(course__in=list(by_course), date=day).values_list("course_id", "start_time")
+    )
+
+    to_create = []
+    for course, schedules in by_course.items():
+        if day >= course.semester_start_date + datetime.timedelta(weeks=course.total_weeks):
+            continue
+        target, _ = plan_course_sessions(course, schedules, holiday_dates)
+        for (date, start_time), (end_time, week_number) in target.items():
+            if date != day or (course.pk, start_time) in existing:
+                continue
+            to_create.append(ClassSession(
+                course=course,
+                date=day,
+                start_time=start_time,
+                end_time=end_time,
+                week_number=week_number,
+            ))
+    ClassSession.objects.bulk_create(to_create, ignore_conflicts=True)
+    return len(to_create), len(existing)
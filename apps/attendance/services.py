@@ -1,8 +1,70 @@
+import logging
+import threading
+import time
 from datetime import datetime, timedelta
 
 from django.utils import timezone
 
-from .models import ClassSession, Schedule
+from .models import ClassSession, Schedule, Student
+from .scheduling import get_sessions_version
+
+logger = logging.getLogger(__name__)
+
+# Per-process maps of today's sessions, (course_id, date, start_time) -> ClassSession,
+# and of the students enrolled in today's courses, student_id -> Student.
+# Reloaded when the day changes, when sessions are bulk cancelled/restored
+# (sessions version) or after SESSION_MAP_TTL seconds, whichever comes first.
+SESSION_MAP_TTL = 60
+_session_map = {"key": None, "loaded_at": 0.0, "sessions": {}}
+_session_map_lock = threading.Lock()
+_roster_map = {"key": None, "loaded_at": 0.0, "students": {}}
+_roster_map_lock = threading.Lock()
+
+
+def _daily_map(state, lock, field, today, load):
+    key = (today, get_sessions_version())
+    if state["key"] == key and time.monotonic() - state["loaded_at"] < SESSION_MAP_TTL:
+        return state[field]
+
+    with lock:
+        if state["key"] != key or time.monotonic() - state["loaded_at"] >= SESSION_MAP_TTL:
+            state.update({"key": key, "loaded_at": time.monotonic(), field: load()})
+        return state[field]
+
+
+def get_todays_sessions(today):
+    """Return the in-memory session map for ``today``, reloading it if stale."""
+    return _daily_map(
+        _session_map, _session_map_lock, "sessions", today,
+        lambda: {(s.course_id, s.date, s.start_time): s for s in ClassSession.objects.filter(date=today)},
+    )
+
+
+def get_todays_roster(today):
+    """Return the in-memory ``student_id -> Student`` map of students in courses meeting ``today``."""
+    return _daily_map(
+        _roster_map, _roster_map_lock, "students", today,
+        lambda: {
+            s.student_id: s
+            for s in Student.objects.filter(enrollments__course__sessions__date=today)
+            .only("pk", "student_id", "name")
+            .distinct()
+        },
+    )
+
+
+def find_student(student_id, today):
+    """Look a student number up in today's roster, falling back to the database."""
+    student = get_todays_roster(today).get(student_id)
+    if student is None:
+        student = Student.objects.filter(student_id=student_id).first()
+    return student
+
+
+def preload_todays_data():
+    """Warm-up hook: load today's session and roster maps before the first scan."""
+    today = timezone.localdate()
+    return {"sessions": len(get_todays_sessions(today)), "students": len(get_todays_roster(today))}
 
 
 def get_active_session(course):
@@ -25,16 +87,22 @@ def get_active_session(course):
         now_dt = datetime.combine(today, current_time)
 
         if effective_start_dt <= now_dt <= effective_end_dt:
-            # Class is active — get or create session
-            session, _ = ClassSession.objects.get_or_create(
-                course=course,
-                date=today,
-                start_time=schedule.start_time,
-                defaults={
-                    "end_time": schedule.end_time,
-                    "week_number": _calculate_week_number(course, today),
-                },
-            )
+            # Class is active — sessions are pre-opened by open_todays_sessions,
+            # so this is normally a dictionary lookup with no query.
+            sessions = get_todays_sessions(today)
+            session = sessions.get((course.pk, today, schedule.start_time))
+            if session is None:
+                logger.warning("Session for %s %s %s was not pre-opened", course.code, today, schedule.start_time)
+                session, _ = ClassSession.objects.get_or_create(
+                    course=course,
+                    date=today,
+                    start_time=schedule.start_time,
+                    defaults={
+                        "end_time": schedule.end_time,
+                        "week_number": _calculate_week_number(course, today),
+                    },
+                )
+                sessions[(course.pk, today, schedule.start_time)] = session
             if session.is_cancelled:
                 return None, schedule
             return session, schedule
@@ -0,0 +1,185 @@
+"""Every URL must stay within its query budget and not grow with the data.
+
+Each page is requested against small, medium and large seeded datasets
+(each rolled back before the next), measured on a second request so the
+per-process caches are warm.
+"""
+
+import random
+import tempfile
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from apps.attendance.admin import ROSTER_PREVIEW_SESSION_KEY
+from apps.attendance.importers import plan_roster_import
+from apps.attendance.models import Course, CourseMaterial, Holiday, Student
+from apps.attendance.scheduling import bump_sessions_version
+from apps.attendance.seeding import seed_scale_data
+from apps.core.jobs import save_result_file
+from apps.core.models import Job
+from apps.core.profiling import PROFILE_PARAM
+from apps.portal.services import SESSION_KEY
+
+# (courses, students per course, weeks) per dataset size
+SIZES = {
+    "small": (2, 10, 4),
+    "medium": (4, 60, 10),
+    "large": (6, 200, 14),
+}
+
+DEFAULT_BUDGET = 10
+# Views that legitimately need more queries than the default (still constant in data size)
+QUERY_BUDGETS = {
+    "admin:attendance_course_change": 12,
+    "admin:attendance_excusedabsence_change": 12,
+}
+
+# Pages that answer a GET with something other than 200 by design
+EXPECTED_STATUS = {
+    "portal:login": 302,  # a logged-in student goes to the dashboard
+    "portal:login_submit": 405,  # POST only
+    "attendance:submit_attendance": 405,  # POST only
+    "password_reset_confirm": 302,  # the token moves into the session, then redirects
+}
+
+SKIPPED_NAMESPACES = {"admin", "djdt"}
+# Would end the logged-in sessions for the remaining URLs
+SKIPPED_NAMES = {"logout", "portal:portal_logout"}
+# Admin views added through ModelAdmin.get_urls(), with their kwargs
+ADMIN_EXTRA_URLS = {"admin:attendance_course_roster_preview": ("course_id",)}
+
+
+def seed_dataset(courses, students, weeks, rng):
+    """Seed every student into every course, plus a holiday and course materials."""
+    result = seed_scale_data(
+        rng, courses=courses, students_per_course=students, student_pool=students, weeks=weeks, prefix="QB"
+    )
+    Holiday.objects.create(date=result.courses[0].semester_start_date, name="Budget holiday")
+    CourseMaterial.objects.bulk_create([
+        CourseMaterial(course=course, title=f"Week {week + 1} slides", url="https://example.com/", order=week)
+        for course in result.courses
+        for week in range(weeks)
+    ])
+    return result.courses[0], result.students[0]
+
+
+def iter_url_names(patterns, namespace=""):
+    """Yield ``(name, pattern)`` for every named route outside the skipped namespaces."""
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            if entry.namespace in SKIPPED_NAMESPACES:
+                continue
+            prefix = f"{namespace}{entry.namespace}:" if entry.namespace else namespace
+            yield from iter_url_names(entry.url_patterns, prefix)
+        elif isinstance(entry, URLPattern) and entry.name:
+            yield f"{namespace}{entry.name}", entry
+
+
+def build_urls(values):
+    """Every project URL plus each admin changelist/change/add page, keyed by route name.
+
+    Returns:
+        tuple[dict, list]: The URLs and the routes whose kwargs ``values``
+        has no fixture for.
+    """
+    urls = {"admin:index": reverse("admin:index")}
+    unresolved = []
+    patterns = [*iter_url_names(get_resolver().url_patterns), *ADMIN_EXTRA_URLS.items()]
+    for name, pattern in patterns:
+        if name in SKIPPED_NAMES:
+            continue
+        params = pattern if isinstance(pattern, tuple) else pattern.pattern.regex.groupindex
+        missing = set(params) - set(values)
+        if missing:
+            unresolved.append(f"{name} ({', '.join(sorted(missing))})")
+            continue
+        urls[name] = reverse(name, kwargs={param: values[param] for param in params})
+
+    objects = {Course: values["course"], Student: values["student"]}
+    request = RequestFactory().get("/")
+    request.user = values["user"]
+    for model, model_admin in admin.site._registry.items():
+        info = f"admin:{model._meta.app_label}_{model._meta.model_name}"
+        urls[f"{info}_changelist"] = reverse(f"{info}_changelist")
+        if model_admin.has_add_permission(request):  # read-only admins have no add page
+            urls[f"{info}_add"] = reverse(f"{info}_add")
+        obj = objects.get(model) or model._default_manager.order_by("-pk").first()
+        if obj is not None:
+            urls[f"{info}_change"] = reverse(f"{info}_change", args=[obj.pk])
+    return urls, unresolved
+
+
+# A private cache keeps the daily maps' sessions version away from the shared cache file;
+# job results and profiles go to throwaway directories.
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    MEDIA_ROOT=tempfile.mkdtemp(prefix="qb-media-"),
+    PROFILE_DIR=tempfile.mkdtemp(prefix="qb-profiles-"),
+)
+class QueryBudgetTests(TestCase):
+    def create_fixtures(self, course, student):
+        """Log in a superuser and a portal student and create an object for every URL kwarg."""
+        user = get_user_model().objects.create_superuser("query-budget", "qb@example.com", "x")
+        self.client.force_login(user)
+        session = self.client.session
+        session[SESSION_KEY] = student.student_id
+        session[ROSTER_PREVIEW_SESSION_KEY.format(course.pk)] = {
+            "file": "roster.xls",
+            "students": 1,
+            "course_code": course.code,
+            "diff": plan_roster_import([(course, [(student.student_id, student.name)])]).to_dict(),
+        }
+        session.save()
+
+        job = Job.objects.create(name="attendance.export_matrix", description="Export", status=Job.STATUS_DONE)
+        save_result_file(job, "export.csv", b"Student ID\n")
+        profile_id = self.client.get(reverse("landing"), {PROFILE_PARAM: 1})["X-Profile"]
+        return {
+            "user": user,
+            "course": course,
+            "student": student,
+            "course_id": course.pk,
+            "qr_token": course.qr_token,
+            "fmt": "svg",
+            "job_id": job.pk,
+            "profile_id": profile_id,
+            "uidb64": urlsafe_base64_encode(force_bytes(user.pk)),
+            "token": default_token_generator.make_token(user),
+        }
+
+    def measure(self, size, seed=1):
+        """Query count and status per URL on one dataset size, rolled back afterwards."""
+        courses, students, weeks = SIZES[size]
+        counts = {}
+        with transaction.atomic():
+            course, student = seed_dataset(courses, students, weeks, random.Random(seed))
+            bump_sessions_version()  # drop the previous size's cached daily maps
+            urls, unresolved = build_urls(self.create_fixtures(course, student))
+            self.assertEqual(unresolved, [], "routes without a fixture for their kwargs")
+
+            for name, url in urls.items():
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                counts[name] = (len(queries), response.status_code)
+            transaction.set_rollback(True)
+        return counts
+
+    def test_every_url_within_budget_and_constant_in_data_size(self):
+        results = {size: self.measure(size) for size in SIZES}
+        for name in sorted(set().union(*results.values())):
+            counts = {size: results[size][name] for size in SIZES if name in results[size]}
+            budget = QUERY_BUDGETS.get(name, DEFAULT_BUDGET)
+            with self.subTest(url=name, counts=counts):
+                expected = EXPECTED_STATUS.get(name, 200)
+                self.assertTrue(all(status == expected for _, status in counts.values()), f"expected {expected}")
+                self.assertLessEqual(max(n for n, _ in counts.values()), budget, "over budget")
+                self.assertEqual(len({n for n, _ in counts.values()}), 1, "grows with data")
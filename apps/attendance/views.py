@@ -3,8 +3,8 @@ from django.views.decorators.http import require_GET, require_POST
 
 from apps.core.utils import get_client_ip
 
-from .models import AttendanceRecord, Course, Student
-from .services import get_active_session, get_next_session_info
+from .models import AttendanceRecord, Course
+from .services import find_student, get_active_session, get_next_session_info
 
 
 @require_GET
@@ -64,7 +64,7 @@ def submit_attendance(request, qr_token):
         })
 
     # Try to link to a known student
-    student = Student.objects.filter(student_id=student_id).first()
+    student = find_student(student_id, session.date)
 
     AttendanceRecord.objects.create(
         session=session,
@@ -1 +1,30 @@
-from django.contrib import admin  # noqa: F401
+from django.contrib import admin, messages
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .jobs import queue_warning
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["id", "description", "status", "progress", "created_by", "created_at", "finished_at", "status_link"]
+    list_filter = ["status", "name"]
+    search_fields = ["description", "name"]
+    readonly_fields = [f.name for f in Job._meta.fields]
+
+    def changelist_view(self, request, extra_context=None):
+        warning = queue_warning()
+        if warning:
+            messages.warning(request, warning)
+        return super().changelist_view(request, extra_context)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Status page")
+    def status_link(self, obj):
+        return format_html('<a href="{}">Open</a>', reverse("job_status", args=[obj.pk]))
@@ -0,0 +1,211 @@
+"""Host-local cache backend shared by every worker process, stored in SQLite.
+
+Gunicorn workers are separate processes, so ``LocMemCache`` gives each its
+own copy and a counter bumped in one worker (e.g. the sessions version) is
+never seen by the others. This backend keeps entries in one SQLite file in
+WAL mode: readers never block the single writer, every statement commits on
+its own, and ``incr`` is a single ``UPDATE`` so concurrent increments from
+different workers are never lost.
+
+Integers are stored as SQLite integers (so they can be incremented in
+place); everything else is pickled. When the table grows past
+``MAX_ENTRIES``, expired entries are dropped first, then the least recently
+read ``1 / CULL_FREQUENCY`` of the rest. Read times are only written back
+once per ``ACCESS_RESOLUTION`` seconds so hot keys do not turn every read
+into a write.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "apps.core.cache.SQLiteCache",
+            "LOCATION": "/var/tmp/qr_attendance-cache.sqlite3",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+ACCESS_RESOLUTION = 1.0
+# Check the table size once per this many writes from a process
+CULL_CHECK_INTERVAL = 64
+BUSY_TIMEOUT = 5.0
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache ("
+    " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, accessed REAL NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)",
+)
+
+# An entry is live if it never expires or expires in the future
+LIVE = "(expires IS NULL OR expires > ?)"
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    access_resolution = ACCESS_RESOLUTION
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        """This thread's connection, reopened after a fork (gunicorn --preload)."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.location, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _encode(self, value):
+        if type(value) is int and -(2**63) <= value < 2**63:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _expiry(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _wrote(self, connection):
+        self._writes += 1
+        if self._writes % CULL_CHECK_INTERVAL == 0:
+            self._cull(connection)
+
+    def _cull(self, connection):
+        now = time.time()
+        connection.execute("DELETE FROM cache WHERE expires <= ?", [now])
+        (count,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self._max_entries:
+            if self._cull_frequency == 0:
+                connection.execute("DELETE FROM cache")
+                return
+            connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                [count // self._cull_frequency],
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute(f"SELECT value, accessed FROM cache WHERE key = ? AND {LIVE}", [key, now]).fetchone()
+        if row is None:
+            return default
+        if row[1] < now - self.access_resolution:
+            connection.execute("UPDATE cache SET accessed = ? WHERE key = ?", [now, key])
+        return self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        placeholders = ", ".join("?" * len(keys))
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND {LIVE}", [*keys, time.time()]
+        )
+        return {keys[key]: self._decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            [key, self._encode(value), self._expiry(timeout), time.time()],
+        )
+        self._wrote(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires, now = self._expiry(timeout), time.time()
+        rows = [
+            (self.make_and_validate_key(key, version=version), self._encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)", rows
+            )
+        self._wrote(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Store only if the key is missing or expired, atomically across processes."""
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        connection = self._connection()
+        cursor = connection.execute(
+            "INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, "
+            "accessed = excluded.accessed WHERE cache.expires <= ?",
+            [key, self._encode(value), self._expiry(timeout), now, now],
+        )
+        self._wrote(connection)
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connection().execute(
+            f"UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND {LIVE}",
+            [self._expiry(timeout), now, key, now],
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        """Add ``delta`` in one ``UPDATE``, so concurrent workers never lose a bump.
+
+        Raises:
+            ValueError: The key is missing, expired or not an integer.
+        """
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        # fetchall() steps the statement to completion, which is what commits it
+        rows = self._connection().execute(
+            f"UPDATE cache SET value = value + ?, accessed = ? "
+            f"WHERE key = ? AND typeof(value) = 'integer' AND {LIVE} RETURNING value",
+            [delta, now, key, now],
+        ).fetchall()
+        if not rows:
+            raise ValueError(f"Key '{key}' not found or not an integer")
+        return rows[0][0]
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(f"SELECT 1 FROM cache WHERE key = ? AND {LIVE}", [key, time.time()]).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute("DELETE FROM cache WHERE key = ?", [key]).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            placeholders = ", ".join("?" * len(keys))
+            self._connection().execute(f"DELETE FROM cache WHERE key IN ({placeholders})", keys)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Keep the per-thread connection open across requests, like CONN_MAX_AGE
+        pass
@@ -0,0 +1,139 @@
+"""Database-backed job queue for long admin operations.
+
+Requests call ``submit()`` and redirect to the job's status page, which
+polls until the ``run_jobs`` worker has finished. Handlers live in each
+app's ``jobs.py`` and register with ``@job_handler("<app>.<name>")``; they
+receive the Job plus its params, report progress with ``report()``, may
+attach a file with ``save_result_file()`` and return a JSON-able result
+(``{"messages": [...]}`` is shown on the status page).
+"""
+
+import logging
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# A running job not heard from for this long belongs to a worker that died
+STALE_AFTER = timedelta(minutes=30)
+# A queued job older than this means no run_jobs worker is picking jobs up
+UNCLAIMED_AFTER = timedelta(minutes=1)
+
+_handlers = {}
+
+
+def job_handler(name):
+    def register(func):
+        _handlers[name] = func
+        return func
+
+    return register
+
+
+def get_handler(name):
+    if name not in _handlers:
+        autodiscover_modules("jobs")
+    return _handlers[name]
+
+
+def submit(name, params=None, description="", user=None, return_url=""):
+    """Queue a job (one INSERT) and return it."""
+    get_handler(name)  # fail in the request, not in the worker, on a typo
+    return Job.objects.create(
+        name=name,
+        params=params or {},
+        description=description or name,
+        created_by=user if user is not None and user.is_authenticated else None,
+        return_url=return_url,
+    )
+
+
+def queue_warning(now=None):
+    """A message for the admin when queued jobs are not being picked up, else None."""
+    now = now or timezone.now()
+    waiting = Job.objects.filter(status=Job.STATUS_QUEUED, created_at__lt=now - UNCLAIMED_AFTER).count()
+    if not waiting:
+        return None
+    return (
+        f"{waiting} job(s) have been queued for over a minute and no worker has picked them up. "
+        "Check that `python manage.py run_jobs --loop` is running."
+    )
+
+
+def report(job, done, total, message=""):
+    """Record progress; called by handlers as they go."""
+    job.progress = min(100, round(done / total * 100)) if total else 100
+    job.message = message[:255]
+    Job.objects.filter(pk=job.pk).update(progress=job.progress, message=job.message, updated_at=timezone.now())
+
+
+def save_result_file(job, filename, content):
+    """Store ``content`` (bytes) as the job's downloadable result."""
+    job.result_file.save(filename, ContentFile(content), save=False)
+    Job.objects.filter(pk=job.pk).update(result_file=job.result_file.name, updated_at=timezone.now())
+
+
+def fail_stale_jobs(now=None):
+    """Mark running jobs whose worker stopped reporting as failed (they are not retried)."""
+    now = now or timezone.now()
+    return Job.objects.filter(status=Job.STATUS_RUNNING, updated_at__lt=now - STALE_AFTER).update(
+        status=Job.STATUS_FAILED, error="The worker stopped while running this job.", finished_at=now, updated_at=now
+    )
+
+
+def claim_job():
+    """Take the oldest queued job with ``SELECT ... FOR UPDATE SKIP LOCKED``; None if the queue is empty."""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_QUEUED)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at", "updated_at"])
+    return job
+
+
+def run_job(job):
+    """Run one claimed job and store its outcome."""
+    try:
+        job.result = get_handler(job.name)(job, **job.params)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.pk, job.name)
+        job.status = Job.STATUS_FAILED
+        job.error = f"{type(e).__name__}: {e}"
+    else:
+        job.status = Job.STATUS_DONE
+        job.progress = 100
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "progress", "result", "error", "finished_at", "updated_at"])
+    return job
+
+
+def run_jobs(limit=None):
+    """Run queued jobs one after another until the queue is empty (or ``limit`` ran).
+
+    Returns:
+        tuple[int, int]: (done, failed)
+    """
+    fail_stale_jobs()
+    done = failed = 0
+    while limit is None or done + failed < limit:
+        job = claim_job()
+        if job is None:
+            break
+        if run_job(job).status == Job.STATUS_DONE:
+            done += 1
+        else:
+            failed += 1
+    return done, failed
@@ -0,0 +1,131 @@
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.core.management.commands.createcachetable import Command as CreateCacheTable
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from apps.core.cache import SQLiteCache
+
+BENCH_TABLE = "benchmark_cache_table"
+COUNTER_KEY = "benchmark:counter"
+VALUE = {"course_id": 42, "sessions": list(range(28)), "title": "Attendance matrix"}
+
+
+def build_caches(directory, max_entries):
+    params = {"OPTIONS": {"MAX_ENTRIES": max_entries}, "TIMEOUT": None}
+    return {
+        "locmem": LocMemCache("benchmark", params),
+        "database": DatabaseCache(BENCH_TABLE, params),
+        "sqlite": SQLiteCache(str(Path(directory) / "cache.sqlite3"), params),
+    }
+
+
+def ops_per_second(func, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    return iterations / (time.perf_counter() - start)
+
+
+def _incr_worker(cache, iterations, errors):
+    for _ in range(iterations):
+        try:
+            cache.incr(COUNTER_KEY)
+        except Exception:
+            with errors.get_lock():
+                errors.value += 1
+    connections.close_all()
+
+
+def concurrent_incr(cache, processes, iterations):
+    """Increment one counter from several processes; return (value seen by the parent, errors, seconds)."""
+    cache.set(COUNTER_KEY, 0, timeout=None)
+    connections.close_all()  # children must not share the parent's DB connection
+    context = multiprocessing.get_context("fork")
+    errors = context.Value("i", 0)
+    workers = [context.Process(target=_incr_worker, args=(cache, iterations, errors)) for _ in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return cache.get(COUNTER_KEY), errors.value, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the shared SQLite cache against locmem and the database cache: single-process "
+        "throughput, LRU eviction, and increments from several processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=5000, help="Operations per single-process test")
+        parser.add_argument("--keys", type=int, default=1000, help="Distinct keys read and written")
+        parser.add_argument("--processes", type=int, default=4, help="Processes in the concurrent increment test")
+        parser.add_argument("--increments", type=int, default=500, help="Increments per process")
+
+    def handle(self, *args, **options):
+        iterations, keys = options["iterations"], options["keys"]
+        creator = CreateCacheTable()
+        creator.verbosity = 0
+        creator.create_table(DEFAULT_DB_ALIAS, BENCH_TABLE, dry_run=False)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                caches = build_caches(directory, max_entries=keys * 2)
+                self._throughput(caches, iterations, keys)
+                self._eviction(directory, keys)
+                self._concurrency(caches, options["processes"], options["increments"])
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(BENCH_TABLE)}")
+
+    def _throughput(self, caches, iterations, keys):
+        self.stdout.write(f"Single process, ops/sec ({iterations} operations over {keys} keys):")
+        self.stdout.write(f"  {'backend':<10} {'set':>10} {'get hit':>10} {'get miss':>10} {'incr':>10}")
+        for name, cache in caches.items():
+            cache.clear()
+            cache.set(COUNTER_KEY, 0)
+            results = [
+                ops_per_second(lambda i: cache.set(f"k{i % keys}", VALUE), iterations),
+                ops_per_second(lambda i: cache.get(f"k{i % keys}"), iterations),
+                ops_per_second(lambda i: cache.get(f"missing{i}"), iterations),
+                ops_per_second(lambda i: cache.incr(COUNTER_KEY), iterations),
+            ]
+            self.stdout.write(f"  {name:<10} " + " ".join(f"{r:>10,.0f}" for r in results))
+
+    def _eviction(self, directory, keys):
+        """Fill a small SQLite cache past MAX_ENTRIES while reading a few keys throughout."""
+        max_entries = keys // 4
+        cache = SQLiteCache(str(Path(directory) / "eviction.sqlite3"), {"OPTIONS": {"MAX_ENTRIES": max_entries}})
+        cache.access_resolution = 0  # record every read so the short run shows LRU order
+        hot = [f"hot{i}" for i in range(10)]
+        cold = [f"cold{i}" for i in range(keys)]
+        cache.set_many({key: VALUE for key in hot})
+        for i, key in enumerate(cold):
+            cache.set(key, VALUE)
+            if i % 20 == 0:
+                cache.get_many(hot)
+                for key in hot:
+                    cache.get(key)
+        kept_hot = sum(cache.has_key(key) for key in hot)
+        kept_cold = sum(cache.has_key(key) for key in cold)
+        self.stdout.write(
+            f"LRU eviction: wrote {len(hot) + len(cold)} keys with MAX_ENTRIES={max_entries}; "
+            f"{kept_hot + kept_cold} kept, {kept_hot}/{len(hot)} frequently read keys survived."
+        )
+
+    def _concurrency(self, caches, processes, increments):
+        expected = processes * increments
+        self.stdout.write(f"{processes} processes x {increments} increments of one counter (expected {expected}):")
+        for name, cache in caches.items():
+            value, errors, elapsed = concurrent_incr(cache, processes, increments)
+            verdict = "coherent" if value == expected else "NOT coherent"
+            self.stdout.write(
+                f"  {name:<10} parent sees {value!s:>6}, {errors} errors, "
+                f"{expected / elapsed:,.0f} incr/sec — {verdict}"
+            )
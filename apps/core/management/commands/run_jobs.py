@@ -0,0 +1,38 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.core.jobs import run_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued admin jobs (session generation, roster imports, exports) outside the web workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling the queue every --interval seconds",
+        )
+        parser.add_argument("--interval", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                done, failed = run_jobs()
+            except Exception:
+                if not options["loop"]:
+                    raise
+                # A transient DB error must not stop the worker; try again next round
+                logger.exception("Running jobs failed")
+                connections.close_all()
+                done = failed = 0
+            if done or failed or not options["loop"]:
+                self.stdout.write(f"Ran {done + failed} job(s): {done} done, {failed} failed.")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,105 @@
+"""In-process request metrics rendered in the Prometheus text format.
+
+Each worker process keeps its own counters; a scrape therefore reports the
+worker that served it. Labels are the resolved view name and HTTP method, so
+cardinality stays bounded by the URLconf.
+"""
+
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """Cumulative-bucket histogram; callers hold the registry lock."""
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, n in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += n
+            yield bound, cumulative
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._statuses = {}
+
+    def observe(self, view, method, status, duration, queries, query_time, size):
+        key = (view, method)
+        with self._lock:
+            stats = self._views.get(key)
+            if stats is None:
+                stats = self._views[key] = {
+                    "latency": Histogram(LATENCY_BUCKETS),
+                    "queries": Histogram(QUERY_BUCKETS),
+                    "size": Histogram(SIZE_BUCKETS),
+                    "query_seconds": 0.0,
+                }
+            stats["latency"].observe(duration)
+            stats["queries"].observe(queries)
+            stats["size"].observe(size)
+            stats["query_seconds"] += query_time
+            status_key = (view, method, status)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._statuses.clear()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests by view, method and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (view, method, status), n in sorted(self._statuses.items()):
+                lines.append(f'http_requests_total{{{_labels(view, method)},status="{status}"}} {n}')
+
+            for name, key, help_text in (
+                ("http_request_duration_seconds", "latency", "Request latency in seconds."),
+                ("http_request_db_queries", "queries", "Database queries per request."),
+                ("http_response_size_bytes", "size", "Response body size in bytes."),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (view, method), stats in sorted(self._views.items()):
+                    labels = _labels(view, method)
+                    histogram = stats[key]
+                    for bound, cumulative in histogram.samples():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.total:g}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            lines.append("# HELP http_request_db_seconds_total Time spent in database queries.")
+            lines.append("# TYPE http_request_db_seconds_total counter")
+            for (view, method), stats in sorted(self._views.items()):
+                lines.append(f"http_request_db_seconds_total{{{_labels(view, method)}}} {stats['query_seconds']:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(view, method):
+    view = view.replace("\\", "\\\\").replace('"', '\\"')
+    return f'view="{view}",method="{method}"'
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,118 @@
+import cProfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import request_metrics
+from .profiling import PROFILE_HEADER, PROFILE_PARAM, save_profile
+from .slow_queries import slow_query_log
+
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# cProfile allows one active profiler per interpreter on Python 3.12+
+_profiler_lock = threading.Lock()
+
+
+def view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else "<unresolved>"
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` hook that counts queries and their time.
+
+    With a ``slow_threshold`` (seconds) it also reports slower queries to
+    the slow-query log.
+    """
+
+    __slots__ = ("count", "elapsed", "request", "slow_threshold")
+
+    def __init__(self, request=None, slow_threshold=None):
+        self.count = 0
+        self.elapsed = 0.0
+        self.request = request
+        self.slow_threshold = slow_threshold
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.elapsed += duration
+            self.count += 1
+        if self.slow_threshold is not None and duration >= self.slow_threshold:
+            slow_query_log.record(context["connection"], sql, params, duration, view_name(self.request), many=many)
+        return result
+
+
+class RequestMetricsMiddleware:
+    """Record latency, DB query count/time and response size per view.
+
+    Place it first in ``MIDDLEWARE`` so the timings include the rest of the
+    stack (sessions, auth, messages). Set ``SLOW_QUERY_THRESHOLD_MS`` to also
+    capture slow queries with their plans.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        threshold_ms = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0)
+        self.slow_threshold = threshold_ms / 1000 if threshold_ms > 0 else None
+
+    def __call__(self, request):
+        timer = QueryTimer(request, self.slow_threshold)
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        method = request.method if request.method in KNOWN_METHODS else "OTHER"
+        if response.streaming:
+            size = int(response.get("Content-Length", 0))
+        else:
+            size = len(response.content)
+        request_metrics.observe(
+            view_name(request), method, response.status_code, duration, timer.count, timer.elapsed, size
+        )
+        return response
+
+
+class RequestProfilerMiddleware:
+    """Profile a request when a staff user asks for it.
+
+    Must come after AuthenticationMiddleware. Requests without the query
+    parameter or header only pay a header lookup and a substring check.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if PROFILE_HEADER not in request.META and (
+            PROFILE_PARAM not in request.META.get("QUERY_STRING", "") or PROFILE_PARAM not in request.GET
+        ):
+            return self.get_response(request)
+        if not request.user.is_staff:
+            return self.get_response(request)
+        if not _profiler_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response["X-Profile"] = "busy"
+            return response
+
+        try:
+            timer = QueryTimer()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            with connection.execute_wrapper(timer):
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            wall = time.perf_counter() - start
+            response["X-Profile"] = save_profile(profiler, request, response, wall, timer.count)
+        finally:
+            _profiler_lock.release()
+        return response
@@ -0,0 +1,80 @@
+"""On-demand cProfile captures of single requests, kept in an on-disk ring buffer.
+
+Staff trigger a capture by adding ``?_profile=1`` to any URL or sending an
+``X-Profile: 1`` header (see ``RequestProfilerMiddleware``). Each capture is
+stored as ``<id>.prof`` (loadable with ``pstats``/snakeviz) plus ``<id>.json``
+with the wall time, query count and top functions; only the newest
+``PROFILE_RING_SIZE`` are kept.
+"""
+
+import io
+import json
+import pstats
+import re
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "HTTP_X_PROFILE"
+TOP_FUNCTIONS = 30
+# Ids start with a microsecond timestamp so sorting by name is chronological
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$")
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def profile_paths(profile_id):
+    """Return the (.prof, .json) paths for a capture id, or None if the id is malformed."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    base = profile_dir() / profile_id
+    return base.with_suffix(".prof"), base.with_suffix(".json")
+
+
+def list_profiles():
+    """Summaries of stored captures, newest first."""
+    summaries = []
+    for path in sorted(profile_dir().glob("*.json"), reverse=True):
+        try:
+            summaries.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return summaries
+
+
+def _prune(keep):
+    for path in sorted(profile_dir().glob("*.json"), reverse=True)[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def save_profile(profiler, request, response, wall, queries):
+    """Write one capture to the ring buffer and return its id."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+    prof_path, json_path = profile_paths(profile_id)
+    profiler.dump_stats(prof_path)
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    match = request.resolver_match
+    json_path.write_text(json.dumps({
+        "id": profile_id,
+        "path": request.get_full_path(),
+        "method": request.method,
+        "view": match.view_name if match else "",
+        "status": response.status_code,
+        "user": request.user.get_username(),
+        "wall_ms": round(wall * 1000, 1),
+        "queries": queries,
+        "created": timezone.now().isoformat(),
+        "top_functions": out.getvalue(),
+    }))
+    _prune(settings.PROFILE_RING_SIZE)
+    return profile_id
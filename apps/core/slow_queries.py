@@ -0,0 +1,168 @@
+"""Opt-in capture of slow SQL queries, aggregated by normalized fingerprint.
+
+Enabled by setting ``SLOW_QUERY_THRESHOLD_MS``; ``RequestMetricsMiddleware``
+hands every query over the threshold to ``slow_query_log.record``. The
+first capture of each fingerprint (and any new worst case) also stores the
+database's plan for it. Like the request metrics, the aggregate lives in the
+worker process; every capture is logged as well, so the logs cover all
+workers.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAX_FINGERPRINTS = 200
+
+EXPLAIN_PREFIXES = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "mysql": "EXPLAIN ",
+}
+# ANALYZE runs the statement, so it is only used for plain SELECTs, and on
+# the request thread it repeats an already slow query: at most once per
+# ANALYZE_INTERVAL seconds per worker, plain EXPLAIN otherwise.
+ANALYZE_PREFIXES = {
+    "postgresql": "EXPLAIN (ANALYZE, BUFFERS) ",
+}
+ANALYZE_INTERVAL = 300
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+_last_analyze = {"at": float("-inf")}
+_analyze_lock = threading.Lock()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_SAVEPOINT = re.compile(r'("s\d+_x\d+")')
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so queries differing only in literals group together."""
+    sql = _STRING.sub("?", sql)
+    sql = _SAVEPOINT.sub('"sp"', sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _may_analyze():
+    """True at most once per ``ANALYZE_INTERVAL`` seconds in this process."""
+    now = time.monotonic()
+    with _analyze_lock:
+        if now - _last_analyze["at"] < ANALYZE_INTERVAL:
+            return False
+        _last_analyze["at"] = now
+        return True
+
+
+def explain(connection, sql, params):
+    """Return the database's plan for ``sql`` as text, or None for non-SELECTs.
+
+    Everything, including the savepoint around it, goes through a bare
+    backend cursor, so the EXPLAIN bypasses execute wrappers: it is never
+    captured as a slow query and never counted in request metrics. Plain
+    SELECTs get ANALYZE where supported (rate-limited, see
+    ``ANALYZE_INTERVAL``); a ``WITH`` may hide a data-modifying statement
+    and is only planned. The savepoint (or transaction, in autocommit) is
+    always rolled back, so neither its effects nor a failure leak into the
+    request's transaction.
+    """
+    statement = sql.lstrip().upper()
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if statement.startswith("SELECT"):
+        if connection.vendor in ANALYZE_PREFIXES and _may_analyze():
+            prefix = ANALYZE_PREFIXES[connection.vendor]
+    elif not statement.startswith("WITH"):
+        return None
+    if prefix is None:
+        return None
+
+    if connection.get_autocommit():
+        begin, rollback = ["BEGIN"], ["ROLLBACK"]
+    else:
+        name = connection.ops.quote_name(EXPLAIN_SAVEPOINT)
+        begin, rollback = [f"SAVEPOINT {name}"], [f"ROLLBACK TO SAVEPOINT {name}", f"RELEASE SAVEPOINT {name}"]
+    cursor = connection.create_cursor()
+    try:
+        for command in begin:
+            cursor.execute(command)
+        try:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+        finally:
+            for command in rollback:
+                cursor.execute(command)
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+    if connection.vendor == "sqlite":
+        return "\n".join(str(row[-1]) for row in rows)  # (id, parent, notused, detail)
+    return "\n".join(" | ".join(str(col) for col in row) for row in rows)
+
+
+class SlowQueryLog:
+    def __init__(self, max_fingerprints=MAX_FINGERPRINTS):
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, connection, sql, params, duration, view, many=False):
+        key = fingerprint(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    return  # keep memory bounded; reset() to start over
+                entry = self._entries[key] = {
+                    "id": hashlib.sha1(key.encode()).hexdigest()[:12],
+                    "fingerprint": key,
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "views": {},
+                    "sql": sql,
+                    "plan": None,
+                    "last_seen": 0.0,
+                }
+            worst = duration > entry["max"]
+            entry["count"] += 1
+            entry["total"] += duration
+            entry["max"] = max(entry["max"], duration)
+            entry["views"][view] = entry["views"].get(view, 0) + 1
+            entry["last_seen"] = time.time()
+            if worst:
+                entry["sql"] = sql
+        logger.warning("Slow query %.1f ms in %s [%s]: %s", duration * 1000, view, entry["id"], key[:500])
+
+        # EXPLAIN outside the lock; executemany has no single statement to plan
+        if worst and not many:
+            plan = explain(connection, sql, params)
+            with self._lock:
+                entry["plan"] = plan
+
+    def entries(self):
+        """Snapshot of all fingerprints, slowest total time first."""
+        with self._lock:
+            rows = [
+                {**entry, "views": sorted(entry["views"].items(), key=lambda item: -item[1])}
+                for entry in self._entries.values()
+            ]
+        for row in rows:
+            row["avg"] = row["total"] / row["count"]
+        return sorted(rows, key=lambda row: -row["total"])
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,100 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_GET
+
+from .jobs import queue_warning
+from .metrics import request_metrics
+from .models import Job
+from .profiling import PROFILE_PARAM, list_profiles, profile_paths
+from .slow_queries import slow_query_log
+from .warmup import warm_up, warmup_state
+
+LOCAL_ADDRESSES = {"127.0.0.1", "::1"}
+
+
+@require_GET
+def metrics(request):
+    """Prometheus scrape endpoint for this worker; staff or localhost only.
+
+    Uses REMOTE_ADDR rather than X-Forwarded-For, which clients can forge.
+    """
+    if not (request.user.is_staff or request.META.get("REMOTE_ADDR") in LOCAL_ADDRESSES):
+        return HttpResponseForbidden()
+    return HttpResponse(request_metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@require_GET
+def ready(request):
+    """Readiness probe: 200 once this worker has warmed up, 503 if a step failed.
+
+    Workers started by gunicorn warm up before accepting connections; other
+    servers (runserver, tests) warm up on the first probe. Failed steps are
+    retried by later probes. The probe is public, so step details stay in
+    the worker's log.
+    """
+    state = warmup_state if warmup_state.ready else warm_up(retry_failed=True)
+    if state.ready:
+        return HttpResponse("ready", content_type="text/plain")
+    return HttpResponse("not ready", content_type="text/plain", status=503)
+
+
+@staff_member_required
+def slow_query_report(request):
+    """Slow queries captured by this worker, grouped by fingerprint, with their plans."""
+    if request.method == "POST" and request.POST.get("action") == "reset":
+        slow_query_log.reset()
+        return redirect("slow_query_report")
+
+    entries = slow_query_log.entries()
+    for entry in entries:
+        entry["last_seen"] = datetime.datetime.fromtimestamp(entry["last_seen"], tz=datetime.timezone.utc)
+        for key in ("total", "max", "avg"):
+            entry[f"{key}_ms"] = entry[key] * 1000
+    return render(request, "admin/slow_queries.html", {
+        "entries": entries,
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "title": "Slow queries",
+    })
+
+
+@staff_member_required
+def profile_list(request):
+    """Stored request profiles (newest first) with their top functions."""
+    return render(request, "admin/profiles.html", {
+        "profiles": list_profiles(),
+        "profile_param": PROFILE_PARAM,
+        "ring_size": settings.PROFILE_RING_SIZE,
+        "title": "Request profiles",
+    })
+
+
+@staff_member_required
+def profile_download(request, profile_id):
+    paths = profile_paths(profile_id)
+    if paths is None or not paths[0].exists():
+        raise Http404("Profile not found")
+    return FileResponse(paths[0].open("rb"), as_attachment=True, filename=f"{profile_id}.prof")
+
+
+@staff_member_required
+def job_status(request, job_id):
+    """Progress of a background job; the page refreshes itself until the job has finished."""
+    job = get_object_or_404(Job, pk=job_id)
+    return render(request, "admin/job_status.html", {
+        "job": job,
+        "job_messages": (job.result or {}).get("messages", []),
+        "queue_warning": None if job.is_finished else queue_warning(),
+        "title": job.description,
+    })
+
+
+@staff_member_required
+def job_download(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    if not job.result_file:
+        raise Http404("This job has no result file")
+    return FileResponse(job.result_file.open("rb"), as_attachment=True, filename=job.result_file.name.rsplit("/", 1)[-1])
@@ -0,0 +1,130 @@
+"""Worker warm-up: pay the first-request costs before the worker takes traffic.
+
+``gunicorn.conf.py`` calls ``warm_up()`` from ``post_worker_init``, i.e.
+after the app is loaded but before the worker accepts connections, so the
+first scans after a deploy or a ``--max-requests`` recycle do not compile
+URL patterns and templates or load today's data themselves. Each step is
+timed and a failing step is recorded rather than raised, so a worker never
+refuses to start because of warm-up; ``/ready`` reports the outcome and
+re-runs the failed steps (at most every ``RETRY_INTERVAL`` seconds), so a
+transient error at boot does not keep the worker unready for good.
+
+Database connections are not warmed: gunicorn's gthread workers serve
+requests on other threads than the one running this hook, and Django
+connections are per thread. ``gunicorn.conf.py`` closes the connection
+the hooks opened on the main thread.
+
+Apps add their own steps through ``WARMUP_HOOKS`` (dotted paths to
+callables taking no arguments).
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import URLResolver, get_resolver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = (".html", ".txt")
+RETRY_INTERVAL = 5.0
+
+
+class WarmupState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = None
+        self.finished = None
+        self.steps = {}
+        self.failed = []
+
+    @property
+    def ready(self):
+        return self.finished is not None and not self.failed
+
+
+warmup_state = WarmupState()
+
+
+def compile_url_patterns(patterns=None):
+    """Compile every URL pattern's regex and build the reverse lookup tables."""
+    resolver = get_resolver()
+    count = 0
+    for entry in resolver.url_patterns if patterns is None else patterns:
+        entry.pattern.regex  # compiled lazily on first access
+        count += 1
+        if isinstance(entry, URLResolver):
+            count += compile_url_patterns(entry.url_patterns)
+    if patterns is None:
+        resolver.reverse_dict  # populates the reverse and namespace lookups
+    return count
+
+
+def compile_templates():
+    """Load every project and app template through the cached loaders."""
+    count = 0
+    for engine in engines.all():
+        directories = [*engine.dirs, *(get_app_template_dirs("templates") if engine.app_dirs else ())]
+        for directory in directories:
+            for path in Path(directory).rglob("*"):
+                if path.suffix not in TEMPLATE_SUFFIXES:
+                    continue
+                try:
+                    engine.get_template(path.relative_to(directory).as_posix())
+                except TemplateSyntaxError:
+                    continue  # e.g. templates for apps that are not installed
+                count += 1
+    return count
+
+
+def warm_up(retry_failed=False):
+    """Run every warm-up step once per process; later calls return the recorded state.
+
+    Args:
+        retry_failed: Re-run the steps that failed, unless they were last
+            tried less than ``RETRY_INTERVAL`` seconds ago.
+    """
+    state = warmup_state
+    began = time.perf_counter()
+    with state.lock:
+        if state.started is not None:
+            if not (retry_failed and state.failed and time.perf_counter() - state.finished >= RETRY_INTERVAL):
+                return state
+            names = set(state.failed)
+            state.failed = []
+        else:
+            names = None
+            state.started = began
+        steps = [
+            ("urls", compile_url_patterns),
+            ("templates", compile_templates),
+            *((path.rsplit(".", 1)[-1], import_string(path)) for path in settings.WARMUP_HOOKS),
+        ]
+        for name, step in steps:
+            if names is not None and name not in names:
+                continue
+            start = time.perf_counter()
+            try:
+                result = step()
+            except Exception:
+                logger.exception("Warm-up step %s failed", name)
+                state.failed.append(name)
+                result = None
+            state.steps[name] = {"ms": round((time.perf_counter() - start) * 1000, 1), "result": result}
+        state.finished = time.perf_counter()
+
+    logger.info(
+        "Worker %s %s in %.0f ms (%s)%s",
+        os.getpid(),
+        "warmed up" if names is None else "retried warm-up",
+        (state.finished - began) * 1000,
+        ", ".join(f"{name} {state.steps[name]['ms']:.0f} ms" for name in names or state.steps),
+        f" (failed: {', '.join(state.failed)})" if state.failed else "",
+    )
+    return state
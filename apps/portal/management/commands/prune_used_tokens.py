@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.portal.models import UsedToken
+from apps.portal.services import MAGIC_LINK_MAX_AGE
+
+
+class Command(BaseCommand):
+    help = "Delete used magic-link tokens older than MAGIC_LINK_MAX_AGE (they can no longer verify anyway)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows deleted per statement")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=MAGIC_LINK_MAX_AGE)
+        expired = UsedToken.objects.filter(created_at__lt=cutoff).order_by("created_at")
+
+        total = 0
+        while True:
+            # Walk the created_at index in short chunks to keep locks brief
+            ids = list(expired.values_list("pk", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            deleted, _ = UsedToken.objects.filter(pk__in=ids).delete()
+            total += deleted
+
+        self.stdout.write(self.style.SUCCESS(f"Pruned {total} used token(s) older than {cutoff:%Y-%m-%d %H:%M}."))
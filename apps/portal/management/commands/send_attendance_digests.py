@@ -0,0 +1,94 @@
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from apps.attendance.models import Course, Enrollment, Student
+from apps.attendance.scheduling import active_courses
+from apps.portal.services import ATTENDANCE_THRESHOLD, attendance_stats
+
+DIGEST_SUBJECT = "Weekly attendance summary"
+
+
+class Command(BaseCommand):
+    help = "Email each student a digest of courses where their attendance is below the threshold"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Send a digest to every enrolled student, not only those below the threshold",
+        )
+        parser.add_argument("--batch-size", type=int, default=100, help="Messages per send_messages call")
+        parser.add_argument("--portal-url", default="", help="Portal link included in each digest")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Write the messages to --output-dir instead of sending them",
+        )
+        parser.add_argument("--output-dir", default="digests")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        # Running courses only; attendance_stats leaves out sessions that have not started
+        enrollments = Enrollment.objects.filter(
+            student__email__gt="", course__in=active_courses(timezone.localdate())
+        )
+        stats = attendance_stats(enrollments)
+
+        by_student = {}
+        for (student_id, course_id), row in stats.items():
+            if row["total"]:  # nothing held yet, nothing to report
+                by_student.setdefault(student_id, {})[course_id] = row
+        if not options["all"]:
+            by_student = {
+                student_id: courses
+                for student_id, courses in by_student.items()
+                if any(row["below_threshold"] for row in courses.values())
+            }
+
+        students = Student.objects.in_bulk(by_student)
+        courses = Course.objects.in_bulk({course_id for rows in by_student.values() for course_id in rows})
+        messages = []
+        for student_id, rows in by_student.items():
+            student = students[student_id]
+            lines = [
+                {"code": courses[course_id].code, "name": courses[course_id].name, **row}
+                for course_id, row in sorted(rows.items(), key=lambda item: courses[item[0]].code)
+            ]
+            body = render_to_string("portal/email/attendance_digest.txt", {
+                "student": student,
+                "courses": lines,
+                "threshold": ATTENDANCE_THRESHOLD,
+                "portal_url": options["portal_url"],
+            })
+            messages.append(EmailMessage(DIGEST_SUBJECT, body, to=[student.email]))
+        prepared = time.perf_counter() - start
+
+        if options["dry_run"]:
+            connection = get_connection(
+                "django.core.mail.backends.filebased.EmailBackend", file_path=options["output_dir"]
+            )
+        else:
+            connection = get_connection()
+
+        # One connection for the whole run instead of one SMTP handshake per email
+        sent = 0
+        send_start = time.perf_counter()
+        connection.open()
+        try:
+            for i in range(0, len(messages), options["batch_size"]):
+                sent += connection.send_messages(messages[i:i + options["batch_size"]]) or 0
+        finally:
+            connection.close()
+        sending = time.perf_counter() - send_start
+
+        rate = sent / sending if sending else 0
+        target = f"written to {options['output_dir']}" if options["dry_run"] else "sent"
+        self.stdout.write(
+            f"{sent} of {len(messages)} digest(s) {target} "
+            f"({len(stats)} enrollments checked in {prepared:.2f}s, "
+            f"{sending:.2f}s sending, {rate:.0f} emails/sec)"
+        )
@@ -0,0 +1,49 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.portal.outbox import MAX_ATTEMPTS, deliver_outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox in batches over one mail connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling the outbox every --interval seconds",
+        )
+        parser.add_argument("--interval", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                self.drain(options)
+            except Exception:
+                if not options["loop"]:
+                    raise
+                # Keep the worker alive through database/mail outages; retry next tick
+                logger.exception("Delivering the outbox failed")
+                connections.close_all()
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def drain(self, options):
+        """Deliver everything that is due, one batch at a time."""
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_outbox(options["batch_size"], options["max_attempts"])
+            total_sent += sent
+            total_failed += failed
+            if sent + failed < options["batch_size"]:
+                break
+        if total_sent or total_failed or not options["loop"]:
+            self.stdout.write(f"Sent {total_sent}, failed {total_failed}.")
@@ -0,0 +1,127 @@
+"""Email outbox: requests enqueue, the ``send_outbox`` command delivers."""
+
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# A claimed batch not finished within this time belongs to a sender that died
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    """Queue an email for background delivery (one INSERT, no network I/O)."""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=list(to),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 60s, 120s, ... capped at an hour."""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _record_failure(email, error, now, max_attempts):
+    logger.warning("Outbox email %s failed (attempt %s): %s", email.pk, email.attempts, error)
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboundEmail.STATUS_FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def claim_batch(batch_size, now):
+    """Mark up to ``batch_size`` due emails as sending, in one short transaction.
+
+    Rows are picked with ``SELECT ... FOR UPDATE SKIP LOCKED``, so several
+    senders never claim the same email; the locks are released before any
+    network I/O. ``next_attempt_at`` becomes the claim's expiry: rows still
+    sending after ``CLAIM_TIMEOUT`` are claimed again.
+    """
+    due = Q(status=OutboundEmail.STATUS_PENDING) | Q(status=OutboundEmail.STATUS_SENDING)
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(due, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        for email in batch:
+            email.status = OutboundEmail.STATUS_SENDING
+            email.attempts += 1
+            email.next_attempt_at = now + CLAIM_TIMEOUT
+            email.updated_at = now
+        OutboundEmail.objects.bulk_update(batch, ["status", "attempts", "next_attempt_at", "updated_at"])
+    return batch
+
+
+def deliver_outbox(batch_size=50, max_attempts=MAX_ATTEMPTS, connection=None):
+    """Send one batch of due emails over a single mail connection.
+
+    The batch is claimed in a short transaction (``claim_batch``) and sent
+    outside it, so a slow mail server holds no row locks. Each email is
+    marked sent right after the server accepts it, so a crash re-sends at
+    most the message in flight. Failed messages are retried with
+    exponential backoff and marked failed after ``max_attempts``; when the
+    mail server cannot be reached at all, every claimed row counts as one
+    failed attempt.
+
+    Returns:
+        tuple[int, int]: (sent, failed) counts for this batch.
+    """
+    now = timezone.now()
+    batch = claim_batch(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    sent = 0
+    failures = []
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except (OSError, smtplib.SMTPException) as e:
+        failures = [(email, e) for email in batch]
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.to, connection=connection
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    failures.append((email, e))
+                else:
+                    OutboundEmail.objects.filter(pk=email.pk).update(
+                        status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(), last_error="", updated_at=now
+                    )
+                    sent += 1
+        finally:
+            try:
+                connection.close()
+            except (OSError, smtplib.SMTPException) as e:
+                # Messages already handed to the server count as sent
+                logger.warning("Closing the mail connection failed: %s", e)
+
+    if failures:
+        for email, error in failures:
+            email.status = OutboundEmail.STATUS_PENDING
+            _record_failure(email, error, now, max_attempts)
+        OutboundEmail.objects.bulk_update(
+            [email for email, _ in failures], ["status", "next_attempt_at", "last_error", "updated_at"]
+        )
+    return sent, len(failures)
@@ -2,9 +2,10 @@ import base64
 import hashlib
 
 from django.core import signing
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import connection
+from django.db.models import Count
 from django.urls import reverse
+from django.utils import timezone
 
 MAGIC_LINK_SALT = "portal-magic-link"
 MAGIC_LINK_MAX_AGE = 900  # 15 minutes
@@ -13,6 +14,8 @@ SESSION_KEY = "portal_student_id"
 
 ALLOWED_EMAIL_DOMAINS = [".edu.tr"]
 
+ATTENDANCE_THRESHOLD = 60  # minimum attendance percentage
+
 
 def generate_token(student_id):
     signer = signing.TimestampSigner(salt=MAGIC_LINK_SALT)
@@ -21,12 +24,6 @@ def generate_token(student_id):
 
 
 def verify_token(token):
-    from .models import UsedToken
-
-    token_hash = hashlib.sha256(token.encode()).hexdigest()
-    if UsedToken.objects.filter(token_hash=token_hash).exists():
-        return None
-
     try:
         signed = base64.urlsafe_b64decode(token.encode()).decode()
     except Exception:
@@ -37,27 +34,130 @@ def verify_token(token):
     except (signing.BadSignature, signing.SignatureExpired):
         return None
 
-    UsedToken.objects.create(token_hash=token_hash)
+    if not consume_token(hashlib.sha256(token.encode()).hexdigest()):
+        return None
     return student_id
 
 
+def consume_token(token_hash):
+    """Mark a token as used; return False if it already was.
+
+    A single ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` both checks and
+    consumes the token, so two concurrent requests can't both succeed.
+    Supported by PostgreSQL and SQLite >= 3.35.
+    """
+    from .models import UsedToken
+
+    meta = UsedToken._meta
+    quote = connection.ops.quote_name
+    hash_column = quote(meta.get_field("token_hash").column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(meta.db_table)} ({hash_column}, {quote(meta.get_field('created_at').column)}) "
+            f"VALUES (%s, %s) ON CONFLICT ({hash_column}) DO NOTHING RETURNING {quote(meta.pk.column)}",
+            [token_hash, connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+        return cursor.fetchone() is not None
+
+
 def send_magic_link(request, student):
+    """Queue the login link email; ``send_outbox`` delivers it outside the request."""
+    from .outbox import enqueue_email
+
     token = generate_token(student.student_id)
     url = request.build_absolute_uri(reverse("portal:magic_login", args=[token]))
     try:
-        send_mail(
+        enqueue_email(
             subject="Your Attendance Portal Login Link",
-            message=f"Hi {student.name},\n\nClick the link below to view your attendance:\n\n{url}\n\nThis link expires in 15 minutes.",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[student.email],
+            body=f"Hi {student.name},\n\nClick the link below to view your attendance:\n\n{url}\n\nThis link expires in 15 minutes.",
+            to=[student.email],
         )
         return True
     except Exception as e:
         import logging
-        logging.getLogger(__name__).error("Magic link email failed: %s", e)
+        logging.getLogger(__name__).error("Magic link email could not be queued: %s", e)
         return False
 
 
+def attendance_percentage(attended, total, excused):
+    effective_total = total - excused
+    return round(attended / effective_total * 100) if effective_total > 0 else 0
+
+
+def attendance_stats(enrollments, use_summaries=True, now=None):
+    """Attendance counts for many enrollments with three grouped queries.
+
+    Enrollments of archived semesters have no live rows left; their frozen
+    AttendanceSummary is used instead (one extra query).
+
+    Args:
+        enrollments: Enrollment queryset to report on.
+        use_summaries: Set to False to count live rows only.
+        now: Cutoff for held sessions (see ``scheduling.held_sessions``);
+            defaults to the current time.
+
+    Returns:
+        dict: ``{(student_id, course_id): {"attended", "total", "excused",
+        "percentage", "below_threshold"}}`` keyed by primary keys.
+    """
+    from apps.attendance.models import AttendanceRecord, AttendanceSummary, ClassSession, ExcusedAbsence
+    from apps.attendance.scheduling import held_sessions
+
+    pairs = list(enrollments.values_list("student_id", "course_id"))
+    # Subqueries rather than id lists keep large runs under the bind-parameter limit
+    course_ids = enrollments.values("course_id")
+    student_ids = enrollments.values("student_id")
+
+    now = now or timezone.now()
+    totals = dict(
+        ClassSession.objects.filter(held_sessions(now=now), course_id__in=course_ids)
+        .values("course_id")
+        .annotate(n=Count("pk"))
+        .values_list("course_id", "n")
+    )
+    attended = {
+        (student_id, course_id): n
+        for student_id, course_id, n in AttendanceRecord.objects.filter(
+            held_sessions("session__", now), student_id__in=student_ids, session__course_id__in=course_ids
+        )
+        .values("student_id", "session__course_id")
+        .annotate(n=Count("session", distinct=True))
+        .values_list("student_id", "session__course_id", "n")
+    }
+    excused = {
+        (student_id, course_id): n
+        for student_id, course_id, n in ExcusedAbsence.objects.filter(
+            held_sessions("session__", now), student_id__in=student_ids, session__course_id__in=course_ids
+        )
+        .values("student_id", "session__course_id")
+        .annotate(n=Count("pk"))
+        .values_list("student_id", "session__course_id", "n")
+    }
+
+    frozen = {}
+    if use_summaries:
+        frozen = {
+            (student_id, course_id): {"attended": n_attended, "total": n_total, "excused": n_excused}
+            for student_id, course_id, n_attended, n_total, n_excused in AttendanceSummary.objects.filter(
+                enrollment__in=enrollments
+            ).values_list(
+                "enrollment__student_id", "enrollment__course_id", "attended", "total_sessions", "excused"
+            )
+        }
+
+    stats = {}
+    for key in pairs:
+        row = frozen.get(key) or {
+            "attended": attended.get(key, 0),
+            "total": totals.get(key[1], 0),
+            "excused": excused.get(key, 0),
+        }
+        row["percentage"] = attendance_percentage(row["attended"], row["total"], row["excused"])
+        row["below_threshold"] = row["percentage"] < ATTENDANCE_THRESHOLD
+        stats[key] = row
+    return stats
+
+
 def login_student(request, student_id):
     request.session[SESSION_KEY] = student_id
 
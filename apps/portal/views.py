@@ -1,12 +1,13 @@
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_GET, require_POST
 
-from apps.attendance.models import ClassSession, CourseMaterial, Enrollment, ExcusedAbsence, Student
-
-ATTENDANCE_THRESHOLD = 60  # minimum attendance percentage
+from apps.attendance.models import CourseMaterial, Enrollment, Student
+from apps.attendance.reports import load_course_attendance
 
 from .decorators import portal_login_required
 from .services import (
+    ATTENDANCE_THRESHOLD,
+    attendance_stats,
     get_logged_in_student_id,
     login_student,
     logout_student,
@@ -41,31 +42,22 @@ def dashboard(request):
     student_id = get_logged_in_student_id(request)
     student = get_object_or_404(Student, student_id=student_id)
     enrollments = Enrollment.objects.filter(student=student).select_related("course")
+    stats = attendance_stats(enrollments)
 
     courses = []
     for enrollment in enrollments:
         course = enrollment.course
-        total_sessions = ClassSession.objects.filter(course=course, is_cancelled=False).count()
-        attended = ClassSession.objects.filter(
-            course=course,
-            is_cancelled=False,
-            records__student=student,
-        ).distinct().count()
-        excused_count = ExcusedAbsence.objects.filter(
-            student=student, session__course=course, session__is_cancelled=False
-        ).count()
-        effective_total = total_sessions - excused_count
-        percentage = round(attended / effective_total * 100) if effective_total > 0 else 0
+        row = stats[(student.pk, course.pk)]
         courses.append({
             "id": course.pk,
             "name": course.name,
             "code": course.code,
-            "attended": attended,
-            "total": total_sessions,
-            "excused": excused_count,
-            "effective_total": effective_total,
-            "percentage": percentage,
-            "below_threshold": percentage < ATTENDANCE_THRESHOLD,
+            "attended": row["attended"],
+            "total": row["total"],
+            "excused": row["excused"],
+            "effective_total": row["total"] - row["excused"],
+            "percentage": row["percentage"],
+            "below_threshold": row["below_threshold"],
         })
 
     return render(request, "portal/dashboard.html", {
@@ -83,32 +75,18 @@ def course_detail(request, course_id):
     enrollment = get_object_or_404(Enrollment, student=student, course_id=course_id)
     course = enrollment.course
 
-    # Attendance detail
-    sessions = ClassSession.objects.filter(
-        course=course, is_cancelled=False
-    ).order_by("date", "start_time")
-
-    attended_session_ids = set(
-        ClassSession.objects.filter(
-            course=course,
-            is_cancelled=False,
-            records__student=student,
-        ).values_list("id", flat=True)
-    )
-
-    excused_session_ids = set(
-        ExcusedAbsence.objects.filter(
-            student=student, session__course=course, session__is_cancelled=False
-        ).values_list("session_id", flat=True)
-    )
+    # Attendance detail (read from the archive files for archived semesters)
+    data = load_course_attendance(course, student=student)
+    attended_session_ids = {session_id for _, session_id in data.attended}
+    excused_session_ids = {session_id for _, session_id in data.excused}
 
     session_list = []
-    for s in sessions:
+    for s in data.sessions:
         session_list.append({
             "date": s.date,
             "week_number": s.week_number,
-            "attended": s.id in attended_session_ids,
-            "excused": s.id in excused_session_ids,
+            "attended": s.pk in attended_session_ids,
+            "excused": s.pk in excused_session_ids,
         })
 
     total = len(session_list)
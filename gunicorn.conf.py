@@ -0,0 +1,15 @@
+"""Gunicorn settings picked up automatically from the working directory.
+
+Command-line flags (see Procfile) still take precedence over anything here.
+"""
+
+
+def post_worker_init(worker):
+    # The app is loaded but the worker has not accepted a connection yet
+    from django.db import connections
+
+    from apps.core.warmup import warm_up
+
+    warm_up()
+    # Requests run on other threads; don't keep the main thread's connection idle
+    connections.close_all()
@@ -29,12 +29,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "apps.core.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "apps.core.middleware.RequestProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -87,10 +89,34 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# One SQLite file shared by every worker on the host, so cached values and
+# version counters agree across gunicorn processes (see apps/core/cache.py)
+CACHES = {
+    "default": {
+        "BACKEND": "apps.core.cache.SQLiteCache",
+        "LOCATION": config("CACHE_LOCATION", default=str(BASE_DIR / "cache.sqlite3")),
+        "OPTIONS": {"MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=10000, cast=int)},
+    }
+}
+
 LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = "/instructor/"
 LOGOUT_REDIRECT_URL = "/instructor/"
 
+# Queries slower than this are logged and EXPLAINed (staff report at
+# /admin/slow-queries/); 0 turns capture off
+SLOW_QUERY_THRESHOLD_MS = config("SLOW_QUERY_THRESHOLD_MS", default=0, cast=int)
+
+# Staff request profiling (?_profile=1 or X-Profile header); newest captures kept
+PROFILE_DIR = config("PROFILE_DIR", default=str(BASE_DIR / "profiles"))
+PROFILE_RING_SIZE = config("PROFILE_RING_SIZE", default=50, cast=int)
+
+# Extra steps run by apps.core.warmup when a gunicorn worker starts
+WARMUP_HOOKS = ["apps.attendance.services.preload_todays_data"]
+
+# Closed semesters exported by ``manage.py archive_semester``
+ARCHIVE_ROOT = config("ARCHIVE_ROOT", default=str(BASE_DIR / "archive"))
+
 # QR Attendance settings
 QR_GRACE_BEFORE_MINUTES = 5
 QR_GRACE_AFTER_MINUTES = 15
@@ -9,6 +9,15 @@ from apps.attendance.admin_views import (
     import_grades,
     instructor_dashboard,
 )
+from apps.core.views import (
+    job_download,
+    job_status,
+    metrics,
+    profile_download,
+    profile_list,
+    ready,
+    slow_query_report,
+)
 
 urlpatterns = [
     path("", TemplateView.as_view(template_name="landing.html"), name="landing"),
@@ -16,12 +25,19 @@ urlpatterns = [
     path("admin/attendance/qr/<int:course_id>/", course_qr_code, name="course_qr_code"),
     path("admin/attendance/grades/<int:course_id>/", import_grades, name="import_grades"),
     path("admin/attendance/dashboard/<int:course_id>/", instructor_dashboard, name="instructor_dashboard"),
+    path("admin/slow-queries/", slow_query_report, name="slow_query_report"),
+    path("admin/profiles/", profile_list, name="profile_list"),
+    path("admin/profiles/<str:profile_id>.prof", profile_download, name="profile_download"),
+    path("admin/jobs/<int:job_id>/", job_status, name="job_status"),
+    path("admin/jobs/<int:job_id>/download/", job_download, name="job_download"),
     path("admin/", admin.site.urls),
     path("accounts/", include("django.contrib.auth.urls")),
     path("instructor/", include("apps.attendance.instructor_urls")),
     path("a/", include("apps.attendance.urls")),
     path("api/", include("apps.api.urls")),
     path("portal/", include("apps.portal.urls")),
+    path("metrics", metrics, name="metrics"),
+    path("ready", ready, name="ready"),
 ]
 
 if settings.DEBUG: